@@ -14,7 +14,6 @@ import os
 from pathlib import Path
 
 import dj_database_url
-import google.generativeai as genai
 from dotenv import load_dotenv
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -78,6 +77,21 @@ DATABASES = {
     )
 }
 
+# Caches
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# "shared" is visible to every worker (table created by `manage.py createcachetable`)
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "shared": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "crossword_cache",
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -125,8 +139,109 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GEMINI_MODEL_NAME = "gemini-2.5-flash"
 
-# Configure Gemini once at startup
-genai.configure(api_key=GEMINI_API_KEY)
+# Where words and clues come from: "gemini", "fixtures" (crossword/tests
+# sample files) or "wordlist" (local tagged corpus at CLUE_CORPUS_PATH).
+# USE_SAMPLE_CROSSWORD_DATA=true is kept as a shortcut for "fixtures".
+USE_SAMPLE_CROSSWORD_DATA = (
+    os.getenv("USE_SAMPLE_CROSSWORD_DATA", "False").lower() == "true"
+)
+CLUE_PROVIDER = os.getenv(
+    "CLUE_PROVIDER", "fixtures" if USE_SAMPLE_CROSSWORD_DATA else "gemini"
+)
+# provider answering when the main one fails, e.g. "wordlist"; empty to disable.
+# Its answers bypass the clue cache so an outage is never cached.
+CLUE_FALLBACK_PROVIDER = os.getenv("CLUE_FALLBACK_PROVIDER", "")
+CLUE_CORPUS_PATH = os.getenv(
+    "CLUE_CORPUS_PATH", str(BASE_DIR / "crossword" / "data" / "word_corpus.json")
+)
+
+# Stream words from the LLM and place them as they arrive
+CROSSWORD_STREAMING = os.getenv("CROSSWORD_STREAMING", "False").lower() == "true"
+
+# Lay out each puzzle with this many seeds in a process pool and keep the best
+# grid (1 = single layout in the request process)
+CROSSWORD_LAYOUT_SEEDS = int(os.getenv("CROSSWORD_LAYOUT_SEEDS", "1"))
+CROSSWORD_LAYOUT_WORKERS = int(os.getenv("CROSSWORD_LAYOUT_WORKERS", "0")) or None
+# seconds to wait for the layout pool before using whatever finished
+CROSSWORD_LAYOUT_DEADLINE = float(os.getenv("CROSSWORD_LAYOUT_DEADLINE", "3"))
+
+# Clue cache in front of the LLM (crossword/services/clue_cache.py)
+CLUE_CACHE_ALIAS = "shared"
+CLUE_CACHE_TIMEOUT = int(os.getenv("CLUE_CACHE_TIMEOUT", str(60 * 60 * 24)))
+CLUE_CACHE_LOCAL_SIZE = int(os.getenv("CLUE_CACHE_LOCAL_SIZE", "256"))
+# request this many times more words than a puzzle needs and sample from them
+CLUE_CACHE_POOL_FACTOR = float(os.getenv("CLUE_CACHE_POOL_FACTOR", "1.5"))
+
+# Concurrent identical clue requests share one LLM call (crossword/services/single_flight.py)
+# seconds the cross-worker lock is held at most, and followers wait for the leader
+SINGLE_FLIGHT_LOCK_TIMEOUT = int(os.getenv("SINGLE_FLIGHT_LOCK_TIMEOUT", "90"))
+SINGLE_FLIGHT_WAIT_TIMEOUT = int(os.getenv("SINGLE_FLIGHT_WAIT_TIMEOUT", "60"))
+
+# Pre-generated puzzle stock (crossword/services/puzzle_pool.py)
+PUZZLE_POOL_TARGET_STOCK = int(os.getenv("PUZZLE_POOL_TARGET_STOCK", "3"))
+# requests before a (category, size) is kept in stock
+PUZZLE_POOL_MIN_REQUESTS = int(os.getenv("PUZZLE_POOL_MIN_REQUESTS", "5"))
+PUZZLE_POOL_MAX_AGE = int(os.getenv("PUZZLE_POOL_MAX_AGE", str(60 * 60 * 24 * 7)))
+PUZZLE_POOL_REFILL_WORKERS = int(os.getenv("PUZZLE_POOL_REFILL_WORKERS", "2"))
+
+# Background generation jobs (crossword/services/generation_jobs.py)
+# jobs generating at once per process; they wait on Gemini without holding a
+# thread, LLM_MAX_CONCURRENCY still caps the calls in flight
+GENERATION_JOB_CONCURRENCY = int(os.getenv("GENERATION_JOB_CONCURRENCY", "8"))
+# seconds before a running or still pending job is failed; the page gives up
+# polling after 3 minutes (JOB_POLL_TIMEOUT_MS in crossword.js)
+GENERATION_JOB_TIMEOUT = int(os.getenv("GENERATION_JOB_TIMEOUT", "300"))
+# seconds a pending job may wait before any worker's sweep picks it up
+GENERATION_JOB_REQUEUE_AFTER = int(os.getenv("GENERATION_JOB_REQUEUE_AFTER", "10"))
+GENERATION_JOB_SWEEP_INTERVAL = int(os.getenv("GENERATION_JOB_SWEEP_INTERVAL", "15"))
+# seconds finished jobs (and their grids) are kept for the page to fetch
+GENERATION_JOB_RETENTION = int(os.getenv("GENERATION_JOB_RETENTION", "3600"))
+
+# HTTP transport for LLM calls (crossword/services/llm_transport.py)
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "90"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+# requests in flight per process, and how long a caller waits for a slot
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_ACQUIRE_TIMEOUT = float(os.getenv("LLM_ACQUIRE_TIMEOUT", "30"))
+# requests started per minute per process, retries and hedges included
+# (0 = no limit); manage.py generate_crosswords sets its own with --rate
+LLM_RATE_LIMIT = float(os.getenv("LLM_RATE_LIMIT", "0"))
+# attempts including the first, backoff is full jitter up to the max delay
+LLM_RETRY_ATTEMPTS = int(os.getenv("LLM_RETRY_ATTEMPTS", "3"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "8"))
+# send a second request when one runs past the p95 latency
+LLM_HEDGE = os.getenv("LLM_HEDGE", "True").lower() == "true"
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+# split requests for at least LLM_CHUNK_MIN_WORDS words into concurrent calls of
+# LLM_CHUNK_WORDS (0 = never). The threshold is on the words asked of the LLM,
+# so it includes CLUE_CACHE_POOL_FACTOR: with 1.5 a medium puzzle asks for 75
+# and stays one call, large (120) and XL (150) are split. One request makes at
+# most LLM_MAX_CONCURRENCY // 2 calls, spares included, so it never holds
+# every slot.
+LLM_CHUNK_WORDS = int(os.getenv("LLM_CHUNK_WORDS", "25"))
+LLM_CHUNK_MIN_WORDS = int(os.getenv("LLM_CHUNK_MIN_WORDS", "80"))
+# extra calls on the async path only, the slowest are cancelled once enough
+# words arrive (sync calls can't be cancelled once sent)
+LLM_CHUNK_SPARE = int(os.getenv("LLM_CHUNK_SPARE", "1"))
+
+# Bearer token required by /metrics; when empty /metrics is only served with
+# DEBUG on, so production scrapes need a token
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Per-stage timing lines (crossword/services/metrics.py) and other app logs
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "crossword": {
+            "handlers": ["console"],
+            "level": os.getenv("CROSSWORD_LOG_LEVEL", "INFO"),
+        },
+    },
+}
 
 LOGIN_REDIRECT_URL = "crossword:home"
 LOGOUT_REDIRECT_URL = "crossword:home"
@@ -17,7 +17,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.contrib.auth import views as auth_views
-from crossword.views import signup, logout_view
+from crossword.views import signup, logout_view, metrics_export
 from django.views.generic import RedirectView
 
 
@@ -29,6 +29,7 @@ urlpatterns = [
     ), name="login"),
     path("accounts/signup/", signup, name="signup"),
     path("accounts/logout/", logout_view, name="logout"),
+    path("metrics", metrics_export, name="metrics"),
     
     #temp fix
     path("", RedirectView.as_view(url="/crossword/", permanent=False)),
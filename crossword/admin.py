@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import SavedCrossword
+from .models import CategoryPopularity, PooledPuzzle, Puzzle, SavedCrossword
 
 
 @admin.register(SavedCrossword)
@@ -7,3 +7,24 @@ class SavedCrosswordAdmin(admin.ModelAdmin):
     list_display = ("id", "user", "category", "created_at", "updated_at")
     list_filter = ("category", "created_at")
     search_fields = ("user__username", "category")
+    raw_id_fields = ("puzzle",)
+
+
+@admin.register(Puzzle)
+class PuzzleAdmin(admin.ModelAdmin):
+    list_display = ("id", "content_hash", "rows", "cols", "created_at")
+    search_fields = ("content_hash",)
+
+
+@admin.register(CategoryPopularity)
+class CategoryPopularityAdmin(admin.ModelAdmin):
+    list_display = ("category", "size", "request_count", "last_requested_at")
+    list_filter = ("size",)
+    search_fields = ("category",)
+
+
+@admin.register(PooledPuzzle)
+class PooledPuzzleAdmin(admin.ModelAdmin):
+    list_display = ("id", "category", "size", "created_at")
+    list_filter = ("size", "created_at")
+    search_fields = ("category",)
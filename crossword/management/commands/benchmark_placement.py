@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from crossword.services import benchmark
+
+
+class Command(BaseCommand):
+    help = "Benchmark grid placement offline on fixed word lists"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workload",
+            action="append",
+            choices=list(benchmark.WORKLOADS),
+            help="Workload to run (repeatable), all by default",
+        )
+        parser.add_argument("--seed", type=int, default=benchmark.DEFAULT_SEED)
+        parser.add_argument(
+            "--repeats",
+            type=int,
+            default=3,
+            help="Timed runs per workload, the median is reported",
+        )
+        parser.add_argument(
+            "--save-baseline",
+            action="store_true",
+            help=f"Store the results as the new baselines in {benchmark.BASELINES_PATH.name}",
+        )
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Exit with an error if any workload regressed against the baselines",
+        )
+
+    def handle(self, *args, **options):
+        results = benchmark.run(
+            options["workload"], options["seed"], options["repeats"]
+        )
+        baselines = benchmark.load_baselines()
+
+        self.stdout.write(
+            f"{'workload':<15}{'words':>6}{'place ms':>10}{'finish ms':>10}"
+            f"{'peak KB':>10}{'placed':>8}{'density':>9}"
+        )
+        regressions = []
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<15}{result['words']:>6}{result['place_ms']:>10.1f}"
+                f"{result['finish_ms']:>10.1f}{result['peak_kb']:>10.1f}"
+                f"{result['placed_ratio']:>8.2f}{result['density']:>9.3f}"
+            )
+            regressions += benchmark.compare(name, result, baselines)
+
+        if options["save_baseline"]:
+            benchmark.save_baselines(results, options["seed"])
+            self.stdout.write(f"Saved baselines to {benchmark.BASELINES_PATH}")
+
+        for message in regressions:
+            self.stderr.write(message)
+        if options["check"] and regressions:
+            raise CommandError(f"{len(regressions)} performance regression(s)")
@@ -0,0 +1,84 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from crossword.services import batch
+
+
+class Command(BaseCommand):
+    help = "Generate puzzles in bulk into a JSONL archive (resumable)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "input",
+            help="CSV of category[,size[,count]] lines, one puzzle per count",
+        )
+        parser.add_argument(
+            "output",
+            help="JSONL archive to append to, gzip-compressed if it ends in .gz",
+        )
+        parser.add_argument(
+            "--size",
+            default="medium",
+            choices=batch.SIZES,
+            help="Size for lines that don't give one",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=settings.LLM_MAX_CONCURRENCY,
+            help="LLM requests in flight at once (a clue list may take several)",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=60,
+            help="LLM requests started per minute at most, retries included, "
+            "0 for no limit",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            help="Base layout seed, for reproducible grids",
+        )
+        parser.add_argument(
+            "--cache",
+            action="store_true",
+            help="Sample clue lists from the clue cache; repeated categories "
+            "then share one word pool",
+        )
+
+    def handle(self, *args, **options):
+        self.verbosity = options["verbosity"]
+        try:
+            items = batch.read_items(options["input"], options["size"])
+        except (OSError, ValueError) as e:
+            raise CommandError(e)
+
+        generator = batch.BatchGenerator(
+            concurrency=options["concurrency"],
+            rate=options["rate"],
+            seed=options["seed"],
+            cached=options["cache"],
+        )
+        report = generator.run(items, options["output"], self._progress)
+
+        for (index, category, size), error in report.errors:
+            self.stderr.write(f"#{index} {category} ({size}): {error}")
+        self.stdout.write(
+            f"{report.completed} generated, {report.skipped} already done, "
+            f"{report.failed} failed of {report.total} in {report.seconds:.1f}s"
+        )
+        if report.completed:
+            self.stdout.write(
+                f"{report.per_minute:.1f} puzzles/min, "
+                f"{report.placed_ratio:.0%} of words placed"
+            )
+        if report.failed:
+            raise CommandError(f"{report.failed} puzzle(s) failed, rerun to retry")
+
+    def _progress(self, record, report):
+        if self.verbosity > 1:
+            self.stdout.write(
+                f"[{report.skipped + report.completed}/{report.total}] "
+                f"#{record['index']} {record['category']} ({record['size']})"
+            )
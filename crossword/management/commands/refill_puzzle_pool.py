@@ -0,0 +1,56 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from crossword.services.puzzle_pool import puzzle_pool
+
+
+class Command(BaseCommand):
+    help = "Top up the pre-generated puzzle stock for the most requested categories"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=20,
+            help="Number of most requested (category, size) pairs to stock",
+        )
+        parser.add_argument(
+            "--stock",
+            type=int,
+            default=settings.PUZZLE_POOL_TARGET_STOCK,
+            help="Puzzles to keep in stock per (category, size)",
+        )
+        parser.add_argument(
+            "--drain",
+            action="store_true",
+            help="Delete stock older than PUZZLE_POOL_MAX_AGE before refilling",
+        )
+        parser.add_argument(
+            "--loop",
+            type=int,
+            default=0,
+            metavar="SECONDS",
+            help="Keep running as a background worker, refilling every SECONDS",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            self._refill_once(options)
+            if not options["loop"]:
+                break
+            time.sleep(options["loop"])
+
+    def _refill_once(self, options):
+        if options["drain"]:
+            drained = puzzle_pool.drain_stale()
+            self.stdout.write(f"Drained {drained} stale puzzles")
+
+        for category, size in puzzle_pool.popular(options["limit"]):
+            try:
+                added = puzzle_pool.refill(category, size, target=options["stock"])
+            except Exception as e:
+                self.stderr.write(f"{category} ({size}): refill failed: {e}")
+                continue
+            self.stdout.write(f"{category} ({size}): added {added}")
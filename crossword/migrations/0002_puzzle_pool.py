@@ -0,0 +1,66 @@
+# Generated by Django 5.2.8 on 2026-10-17 18:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crossword", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CategoryPopularity",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("category", models.CharField(max_length=200)),
+                ("size", models.CharField(max_length=20)),
+                ("request_count", models.PositiveIntegerField(default=0)),
+                ("last_requested_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("category", "size"), name="unique_category_popularity"
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="PooledPuzzle",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("category", models.CharField(max_length=200)),
+                ("size", models.CharField(max_length=20)),
+                ("solution_grid", models.JSONField()),
+                ("across_clues", models.JSONField(default=list)),
+                ("down_clues", models.JSONField(default=list)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["category", "size", "created_at"],
+                        name="crossword_p_categor_6a75a2_idx",
+                    )
+                ],
+            },
+        ),
+    ]
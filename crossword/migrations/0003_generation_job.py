@@ -0,0 +1,58 @@
+# Generated by Django 5.2.8 on 2026-10-17 18:01
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crossword", "0002_puzzle_pool"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GenerationJob",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("category", models.CharField(max_length=200)),
+                ("size", models.CharField(max_length=20)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("running", "Running"),
+                            ("done", "Done"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=10,
+                    ),
+                ),
+                ("solution_grid", models.JSONField(blank=True, null=True)),
+                ("across_clues", models.JSONField(default=list)),
+                ("down_clues", models.JSONField(default=list)),
+                ("error_message", models.TextField(blank=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["status", "created_at"],
+                        name="crossword_g_status_64bae0_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,131 @@
+# Generated by Django 5.2.8 on 2026-10-17 18:05
+
+from django.db import migrations, models
+
+# The conversions are copied here rather than imported from crossword.utils
+# so this migration keeps working if the app code changes later.
+
+
+def encode_saved_grids(apps, schema_editor):
+    SavedCrossword = apps.get_model("crossword", "SavedCrossword")
+    for saved in SavedCrossword.objects.all().iterator():
+        grid = saved.solution_grid or []
+        cols = len(grid[0]) if grid else 0
+        letters = []
+        numbers = {}
+        labels = {}
+        for r, row in enumerate(grid):
+            for c, cell in enumerate(row):
+                letters.append(cell["letter"])
+                index = str(r * cols + c)
+                across = cell.get("across_number") or 0
+                down = cell.get("down_number") or 0
+                if across or down:
+                    numbers[index] = [across, down]
+                if cell.get("label"):
+                    labels[index] = cell["label"]
+
+        progress = "".join(
+            (value or " ")[0] for row in (saved.progress_grid or []) for value in row
+        )
+        if len(progress) != len(letters):
+            progress = "".join("-" if letter == "-" else " " for letter in letters)
+
+        saved.rows = len(grid)
+        saved.cols = cols
+        saved.letters = "".join(letters)
+        saved.numbers = numbers
+        saved.labels = labels
+        saved.progress = progress
+        saved.save(
+            update_fields=["rows", "cols", "letters", "numbers", "labels", "progress"]
+        )
+
+
+def decode_saved_grids(apps, schema_editor):
+    SavedCrossword = apps.get_model("crossword", "SavedCrossword")
+    for saved in SavedCrossword.objects.all().iterator():
+        cols = saved.cols
+        grid = []
+        progress_grid = []
+        for r in range(saved.rows):
+            row = []
+            progress_row = []
+            for c in range(cols):
+                index = str(r * cols + c)
+                across, down = saved.numbers.get(index, (0, 0))
+                cell = {
+                    "letter": saved.letters[r * cols + c],
+                    "across_number": across or None,
+                    "down_number": down or None,
+                }
+                if index in saved.labels:
+                    cell["label"] = saved.labels[index]
+                row.append(cell)
+                value = saved.progress[r * cols + c : r * cols + c + 1]
+                progress_row.append("" if value in ("", " ") else value)
+            grid.append(row)
+            progress_grid.append(progress_row)
+
+        saved.solution_grid = grid
+        saved.progress_grid = progress_grid
+        saved.save(update_fields=["solution_grid", "progress_grid"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crossword", "0003_generation_job"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="savedcrossword",
+            name="rows",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="savedcrossword",
+            name="cols",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="savedcrossword",
+            name="letters",
+            field=models.TextField(default=""),
+        ),
+        migrations.AddField(
+            model_name="savedcrossword",
+            name="numbers",
+            field=models.JSONField(default=dict),
+        ),
+        migrations.AddField(
+            model_name="savedcrossword",
+            name="labels",
+            field=models.JSONField(default=dict),
+        ),
+        migrations.AddField(
+            model_name="savedcrossword",
+            name="progress",
+            field=models.TextField(default=""),
+        ),
+        migrations.AlterField(
+            model_name="savedcrossword",
+            name="progress_grid",
+            field=models.JSONField(null=True),
+        ),
+        migrations.AlterField(
+            model_name="savedcrossword",
+            name="solution_grid",
+            field=models.JSONField(null=True),
+        ),
+        migrations.RunPython(encode_saved_grids, decode_saved_grids),
+        migrations.RemoveField(
+            model_name="savedcrossword",
+            name="progress_grid",
+        ),
+        migrations.RemoveField(
+            model_name="savedcrossword",
+            name="solution_grid",
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 18:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crossword", "0004_compact_saved_grids"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="savedcrossword",
+            name="version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-17 18:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crossword", "0005_saved_crossword_version"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="savedcrossword",
+            index=models.Index(
+                fields=["user", "updated_at", "id"], name="saved_user_updated_idx"
+            ),
+        ),
+    ]
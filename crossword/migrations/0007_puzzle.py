@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-17 18:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crossword", "0006_saved_crossword_list_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Puzzle",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("content_hash", models.CharField(max_length=64, unique=True)),
+                ("rows", models.PositiveSmallIntegerField(default=0)),
+                ("cols", models.PositiveSmallIntegerField(default=0)),
+                ("letters", models.TextField(default="")),
+                ("numbers", models.JSONField(default=dict)),
+                ("labels", models.JSONField(default=dict)),
+                ("across_clues", models.JSONField(default=list)),
+                ("down_clues", models.JSONField(default=list)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="savedcrossword",
+            name="puzzle",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="saved_crosswords",
+                to="crossword.puzzle",
+            ),
+        ),
+    ]
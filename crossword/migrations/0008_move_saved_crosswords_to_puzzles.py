@@ -0,0 +1,81 @@
+# Generated by Django 5.2.8 on 2026-10-17 18:30
+
+import hashlib
+import json
+
+from django.db import migrations
+
+# content_hash is copied here rather than imported from crossword.utils
+# so this migration keeps working if the app code changes later.
+
+
+def content_hash(solution, across_clues, down_clues):
+    content = json.dumps(
+        {"solution": solution, "across": across_clues, "down": down_clues},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def move_to_puzzles(apps, schema_editor):
+    Puzzle = apps.get_model("crossword", "Puzzle")
+    SavedCrossword = apps.get_model("crossword", "SavedCrossword")
+    for saved in SavedCrossword.objects.all().iterator():
+        solution = {
+            "rows": saved.rows,
+            "cols": saved.cols,
+            "letters": saved.letters,
+            "numbers": saved.numbers,
+            "labels": saved.labels,
+        }
+        across_clues = saved.across_clues or []
+        down_clues = saved.down_clues or []
+        # identical saves collapse onto the first Puzzle created for them
+        puzzle, _ = Puzzle.objects.get_or_create(
+            content_hash=content_hash(solution, across_clues, down_clues),
+            defaults={
+                **solution,
+                "across_clues": across_clues,
+                "down_clues": down_clues,
+            },
+        )
+        saved.puzzle = puzzle
+        saved.save(update_fields=["puzzle"])
+
+
+def copy_from_puzzles(apps, schema_editor):
+    SavedCrossword = apps.get_model("crossword", "SavedCrossword")
+    for saved in SavedCrossword.objects.select_related("puzzle").iterator():
+        puzzle = saved.puzzle
+        saved.rows = puzzle.rows
+        saved.cols = puzzle.cols
+        saved.letters = puzzle.letters
+        saved.numbers = puzzle.numbers
+        saved.labels = puzzle.labels
+        saved.across_clues = puzzle.across_clues
+        saved.down_clues = puzzle.down_clues
+        saved.save(
+            update_fields=[
+                "rows",
+                "cols",
+                "letters",
+                "numbers",
+                "labels",
+                "across_clues",
+                "down_clues",
+            ]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crossword", "0007_puzzle"),
+    ]
+
+    # Each backfilled row queues a deferred FK trigger on Postgres, so the
+    # schema changes that follow live in their own migration (0009).
+    operations = [
+        migrations.RunPython(move_to_puzzles, copy_from_puzzles),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-17 18:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crossword", "0008_move_saved_crosswords_to_puzzles"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="savedcrossword",
+            name="puzzle",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="saved_crosswords",
+                to="crossword.puzzle",
+            ),
+        ),
+        migrations.RemoveField(
+            model_name="savedcrossword",
+            name="rows",
+        ),
+        migrations.RemoveField(
+            model_name="savedcrossword",
+            name="cols",
+        ),
+        migrations.RemoveField(
+            model_name="savedcrossword",
+            name="letters",
+        ),
+        migrations.RemoveField(
+            model_name="savedcrossword",
+            name="numbers",
+        ),
+        migrations.RemoveField(
+            model_name="savedcrossword",
+            name="labels",
+        ),
+        migrations.RemoveField(
+            model_name="savedcrossword",
+            name="across_clues",
+        ),
+        migrations.RemoveField(
+            model_name="savedcrossword",
+            name="down_clues",
+        ),
+    ]
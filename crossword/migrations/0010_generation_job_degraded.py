@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 19:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crossword", "0009_saved_crossword_puzzle_required"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="generationjob",
+            name="degraded",
+            field=models.BooleanField(default=False),
+        ),
+    ]
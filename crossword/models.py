@@ -1,7 +1,68 @@
 # crossword/models.py
+import uuid
+
 from django.conf import settings
 from django.db import models
 
+from .utils import content_hash
+
+
+class Puzzle(models.Model):
+    """
+    A distinct solution grid and clue set, shared by every save of it.
+    Keyed by content_hash (crossword.utils.content_hash) so saving the
+    same pooled or cached puzzle twice stores it once.
+    """
+
+    content_hash = models.CharField(max_length=64, unique=True)
+
+    # solution in the compact format from crossword/utils.py
+    rows = models.PositiveSmallIntegerField(default=0)
+    cols = models.PositiveSmallIntegerField(default=0)
+    letters = models.TextField(default="")
+    numbers = models.JSONField(default=dict)
+    labels = models.JSONField(default=dict)
+
+    across_clues = models.JSONField(default=list)
+    down_clues = models.JSONField(default=list)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Puzzle {self.content_hash[:12]} ({self.rows}x{self.cols})"
+
+    @property
+    def solution(self):
+        return {
+            "rows": self.rows,
+            "cols": self.cols,
+            "letters": self.letters,
+            "numbers": self.numbers,
+            "labels": self.labels,
+        }
+
+    @classmethod
+    def for_content(cls, solution, across_clues, down_clues):
+        """
+        Returns the stored puzzle with this content, creating it if needed.
+        Call it in a transaction: the row stays locked until commit, so
+        delete_saved_crossword can't drop it as unused before the caller's
+        SavedCrossword points at it.
+        """
+        puzzle, _ = cls.objects.select_for_update().get_or_create(
+            content_hash=content_hash(solution, across_clues, down_clues),
+            defaults={
+                "rows": solution["rows"],
+                "cols": solution["cols"],
+                "letters": solution["letters"],
+                "numbers": solution["numbers"],
+                "labels": solution["labels"],
+                "across_clues": across_clues,
+                "down_clues": down_clues,
+            },
+        )
+        return puzzle
+
 
 class SavedCrossword(models.Model):
     user = models.ForeignKey(
@@ -9,16 +70,109 @@ class SavedCrossword(models.Model):
         on_delete=models.CASCADE,
         related_name="saved_crosswords",
     )
+    puzzle = models.ForeignKey(
+        Puzzle, on_delete=models.PROTECT, related_name="saved_crosswords"
+    )
+    category = models.CharField(max_length=200)
+
+    # same length as puzzle.letters, written through small deltas after creation
+    progress = models.TextField(default="")
+    # bumped on every progress write, for optimistic concurrency checks
+    version = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # keyset pagination of a user's saved list
+            models.Index(
+                fields=["user", "updated_at", "id"], name="saved_user_updated_idx"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.category} for {self.user.username} (id={self.id})"
+
+
+class CategoryPopularity(models.Model):
+    """
+    How often each (normalized category, size) is requested,
+    used to pick which categories the puzzle pool keeps in stock
+    """
+
     category = models.CharField(max_length=200)
-    
-    progress_grid  = models.JSONField()
+    size = models.CharField(max_length=20)
+    request_count = models.PositiveIntegerField(default=0)
+    last_requested_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["category", "size"], name="unique_category_popularity"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.category} ({self.size}): {self.request_count}"
+
+
+class PooledPuzzle(models.Model):
+    """
+    A fully built puzzle waiting to be served for a (normalized category, size)
+    """
+
+    category = models.CharField(max_length=200)
+    size = models.CharField(max_length=20)
+
     solution_grid = models.JSONField()
-    
     across_clues = models.JSONField(default=list)
     down_clues = models.JSONField(default=list)
 
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["category", "size", "created_at"])]
 
     def __str__(self):
-        return f"{self.category} for {self.user.username} (id={self.id})"
+        return f"{self.category} ({self.size}) id={self.id}"
+
+
+class GenerationJob(models.Model):
+    """
+    A crossword generation request run by the local job worker pool,
+    polled by the browser until it is done
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    category = models.CharField(max_length=200)
+    size = models.CharField(max_length=20)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+
+    solution_grid = models.JSONField(null=True, blank=True)
+    across_clues = models.JSONField(default=list)
+    down_clues = models.JSONField(default=list)
+    error_message = models.TextField(blank=True)
+    # clues came from the fallback provider, the page says so
+    degraded = models.BooleanField(default=False)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "created_at"])]
+
+    def __str__(self):
+        return f"{self.category} ({self.size}) {self.status}"
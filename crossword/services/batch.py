@@ -0,0 +1,264 @@
+"""
+Offline bulk generation (manage.py generate_crosswords).
+
+Clue lists are fetched concurrently from the configured provider. A clue
+list can take several LLM requests (chunks, retries, hedges), so the
+limits apply to those: at most `concurrency` in flight and no more than
+`rate` started per minute, on an LLM transport of the run's own. Each list is laid out in the layout process pool while the next ones are
+fetched, and every finished puzzle is appended to a JSONL archive
+(gzip-compressed when the path ends in .gz) and flushed straight away.
+
+Records carry the index of their item in the input, so a restarted run
+skips the items already in the archive and only builds the rest. The
+input list must be the same between runs.
+"""
+
+import asyncio
+import csv
+import gzip
+import json
+import os
+import random
+import time
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from django.conf import settings
+
+from . import layout_pool, metrics
+from .clue_providers import get_provider
+from .crossword_service import CrosswordService
+from .llm_transport import LLMTransport
+from .placement import SIZES, get_placer
+from .word_list import prepare_clues
+from ..utils import content_hash, encode_grid
+
+
+class BatchReport:
+    """
+    Counts for one run; errors is a list of (item, exception)
+    """
+
+    def __init__(self, total, skipped):
+        self.total = total
+        self.skipped = skipped
+        self.completed = 0
+        self.failed = 0
+        self.seconds = 0.0
+        self.words_received = 0
+        self.words_placed = 0
+        self.errors = []
+
+    @property
+    def per_minute(self):
+        return self.completed * 60 / self.seconds if self.seconds else 0.0
+
+    @property
+    def placed_ratio(self):
+        if not self.words_received:
+            return 0.0
+        return self.words_placed / self.words_received
+
+
+def read_items(path, default_size="medium"):
+    """
+    (index, category, size) items from a CSV of `category[,size[,count]]`
+    lines. Blank lines and lines starting with # are skipped; count
+    repeats the line.
+    """
+    items = []
+    with open(path, newline="") as f:
+        for line, row in enumerate(csv.reader(f), start=1):
+            row = [value.strip() for value in row]
+            if not row or not row[0] or row[0].startswith("#"):
+                continue
+            category = row[0]
+            size = row[1] if len(row) > 1 and row[1] else default_size
+            count = int(row[2]) if len(row) > 2 and row[2] else 1
+            if size not in SIZES:
+                raise ValueError(f"line {line}: unknown size {size!r}")
+            for _ in range(count):
+                items.append((len(items), category, size))
+    return items
+
+
+def _open(path, mode):
+    if Path(path).suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def completed_indexes(path):
+    """
+    Indexes already in the archive at path. A record cut off by a crash is
+    dropped and the archive rewritten without it, so appending is safe.
+    """
+    path = Path(path)
+    if not path.exists():
+        return set()
+
+    records = []
+    truncated = False
+    try:
+        with _open(path, "r") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    truncated = True
+                    break
+    except (EOFError, gzip.BadGzipFile):
+        truncated = True
+
+    if truncated:
+        tmp = path.with_name(path.name + ".tmp")
+        with _open(tmp, "w") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        os.replace(tmp, path)
+    return {record["index"] for record in records}
+
+
+def _build(clues, size, seed):
+    """
+    Runs in a layout pool worker: places and numbers one puzzle. Returns
+    (grid, across, down, words kept by prepare_clues, seconds)
+    """
+    placer = get_placer(size, random.Random(seed))
+    start = time.perf_counter()
+    with metrics.size_tier(size):
+        clues = prepare_clues(clues, size)
+        grid, across, down = CrosswordService(None, placer).build_puzzle(clues, size)
+    return grid, across, down, len(clues), time.perf_counter() - start
+
+
+class BatchGenerator:
+    """
+    Builds every item not yet in the archive and returns a BatchReport.
+
+    seed makes layouts reproducible per item (seed + index); clue lists
+    still come from the provider, so they are only as repeatable as it is.
+
+    Clue lists skip the clue cache unless cached is True: a cached pool
+    would hand repeated categories near-duplicate word lists.
+
+    A service passed in keeps its own LLM limits; concurrency then only
+    caps the clue lists fetched at once.
+    """
+
+    def __init__(self, service=None, concurrency=4, rate=60, seed=None, cached=False):
+        if service is None:
+            # callers wait for a slot as long as it takes: the fetch workers
+            # alone can ask for more requests than there are slots
+            transport = LLMTransport.from_settings(
+                max_concurrency=concurrency, rate_limit=rate, acquire_timeout=None
+            )
+            service = CrosswordService(get_provider(cached=cached, transport=transport))
+        self.service = service
+        self.concurrency = concurrency
+        self.seed = seed
+        # layouts queued or running; beyond this, fetching waits for placement
+        workers = settings.CROSSWORD_LAYOUT_WORKERS or os.cpu_count() or 1
+        self.max_pending_layouts = 2 * workers
+
+    def run(self, items, output, on_record=None):
+        return asyncio.run(self.arun(items, output, on_record))
+
+    async def arun(self, items, output, on_record=None):
+        done = completed_indexes(output)
+        todo = [item for item in items if item[0] not in done]
+        report = BatchReport(len(items), len(items) - len(todo))
+        if not todo:
+            return report
+
+        # shared by the fetch workers, each takes the next item when free
+        pending = iter(todo)
+        layouts = asyncio.Semaphore(self.max_pending_layouts)
+        placing = set()
+        start = time.perf_counter()
+
+        with _open(output, "a") as archive:
+
+            def write(record):
+                archive.write(json.dumps(record) + "\n")
+                archive.flush()
+                report.completed += 1
+                report.words_received += record["stats"]["words_received"]
+                report.words_placed += record["stats"]["words_placed"]
+                if on_record is not None:
+                    on_record(record, report)
+
+            def fail(item, error):
+                report.failed += 1
+                report.errors.append((item, error))
+
+            async def place(item, clues, clues_seconds):
+                try:
+                    record = await self._place(item, clues, clues_seconds)
+                except Exception as e:
+                    fail(item, e)
+                else:
+                    write(record)
+                finally:
+                    layouts.release()
+
+            async def fetch_worker():
+                for item in pending:
+                    _, category, size = item
+                    await layouts.acquire()
+                    fetched = time.perf_counter()
+                    try:
+                        clues = await self.service.afetch_clues(category, size)
+                    except Exception as e:
+                        layouts.release()
+                        fail(item, e)
+                        continue
+                    if not clues:
+                        layouts.release()
+                        fail(item, ValueError("no words returned"))
+                        continue
+                    clues_seconds = time.perf_counter() - fetched
+                    # lay out in the background and move on to the next fetch
+                    task = asyncio.create_task(place(item, clues, clues_seconds))
+                    placing.add(task)
+                    task.add_done_callback(placing.discard)
+
+            await asyncio.gather(*(fetch_worker() for _ in range(self.concurrency)))
+            await asyncio.gather(*placing)
+
+        report.seconds = time.perf_counter() - start
+        return report
+
+    async def _place(self, item, clues, clues_seconds):
+        index, category, size = item
+        seed = random.getrandbits(32) if self.seed is None else self.seed + index
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(
+                layout_pool.get_pool(), _build, clues, size, seed
+            )
+        except BrokenProcessPool:
+            # a worker died, start a fresh pool for the remaining items
+            layout_pool._reset_pool()
+            raise
+        grid, across, down, words_received, place_seconds = result
+
+        solution = encode_grid(grid)
+        return {
+            "index": index,
+            "category": category,
+            "size": size,
+            "content_hash": content_hash(solution, across, down),
+            "solution": solution,
+            "across_clues": across,
+            "down_clues": down,
+            "stats": {
+                "seed": seed,
+                # after prepare_clues, so placed_ratio isn't lowered by
+                # words that could never fit
+                "words_received": words_received,
+                "words_placed": len(across) + len(down),
+                "clues_seconds": round(clues_seconds, 3),
+                "place_seconds": round(place_seconds, 3),
+            },
+        }
@@ -0,0 +1,214 @@
+"""
+Offline placement benchmark.
+
+Each workload is a fixed word list and size tier: the two sample files in
+crossword/tests plus synthetic lists of 20 to 500 words generated from a
+seed. A run cleans up the words (word_list.prepare_clues), places them
+with the engine configured for the tier, then numbers and crops the grid
+as CrosswordService does, and reports
+
+    place_ms, finish_ms, total_ms   median wall time over the repeats
+    peak_kb                         tracemalloc peak of one extra run
+    placed_ratio                    words placed / words given
+    density                         letters / cropped grid area
+
+Time budgets are disabled so the search stops on its node budget only,
+which makes layouts (and so placed_ratio and density) reproducible for a
+given seed on any machine. Wall time and memory are compared to the stored
+baselines with a tolerance.
+"""
+
+import json
+import logging
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+from . import metrics
+from .clue_providers import FIXTURES_DIR, load_json
+from .placement import get_placer
+from .word_list import prepare_clues
+
+BASELINES_PATH = FIXTURES_DIR / "perf_baselines.json"
+DEFAULT_SEED = 1234
+
+# English letter frequencies (%), for synthetic words that cross like real ones
+LETTER_FREQUENCIES = {
+    "E": 12.7, "T": 9.1, "A": 8.2, "O": 7.5, "I": 7.0, "N": 6.7, "S": 6.3,
+    "H": 6.1, "R": 6.0, "D": 4.3, "L": 4.0, "C": 2.8, "U": 2.8, "M": 2.4,
+    "W": 2.4, "F": 2.2, "G": 2.0, "Y": 2.0, "P": 1.9, "B": 1.5, "V": 1.0,
+    "K": 0.8, "J": 0.2, "X": 0.2, "Q": 0.1, "Z": 0.1,
+}  # fmt: skip
+
+# name -> (word source, size tier)
+WORKLOADS = {
+    "small_sample": ("small_sample.json", "small"),
+    "large_sample": ("large_sample.json", "default"),
+    "synthetic_20": (20, "small"),
+    "synthetic_50": (50, "medium"),
+    "synthetic_80": (80, "large"),
+    "synthetic_100": (100, "XL"),
+    "synthetic_500": (500, "XL"),
+}
+
+# allowed slowdown before a run counts as a regression
+DEFAULT_TOLERANCES = {
+    "total_ms": 1.0,  # +100%, wall time varies between machines
+    "peak_kb": 0.25,  # +25%
+    "placed_ratio": 0.02,  # absolute drop
+    "density": 0.02,  # absolute drop
+}
+
+# added to the time and memory limits so tiny workloads don't flag noise
+ABSOLUTE_SLACK = {"total_ms": 5.0, "peak_kb": 32.0}
+
+
+def synthetic_words(count, seed, min_length=3, max_length=12):
+    """
+    count distinct uppercase pseudo-words, the same for the same seed
+    """
+    rng = random.Random(seed)
+    letters = list(LETTER_FREQUENCIES)
+    weights = list(LETTER_FREQUENCIES.values())
+    words = {}
+    while len(words) < count:
+        length = rng.randint(min_length, max_length)
+        word = "".join(rng.choices(letters, weights, k=length))
+        words.setdefault(word, f"Synthetic clue {len(words) + 1}")
+    return words
+
+
+def load_workload(name, seed=DEFAULT_SEED):
+    """
+    Returns ({word: clue}, size) for a workload
+    """
+    source, size = WORKLOADS[name]
+    if isinstance(source, int):
+        return synthetic_words(source, seed), size
+    return dict(load_json(FIXTURES_DIR / source)), size
+
+
+def build(clues, size, seed):
+    """
+    One deterministic puzzle build: word clean-up and placement, then
+    numbering and cropping.
+    Returns (final_grid, words_placed, place_seconds, finish_seconds)
+    """
+    # imported here, crossword_service builds the configured clue provider
+    from .crossword_service import CrosswordService
+
+    placer = get_placer(size, rng=random.Random(seed))
+    if hasattr(placer, "time_budget"):
+        placer.time_budget = float("inf")
+
+    start = time.perf_counter()
+    clues = prepare_clues(clues, size)
+    grid, words_placed = placer.place(clues.keys())
+    placed = time.perf_counter()
+    final_grid, _, _ = CrosswordService(None)._finish_puzzle(clues, grid, words_placed)
+    finished = time.perf_counter()
+    return final_grid, words_placed, placed - start, finished - placed
+
+
+@contextmanager
+def quiet_stage_logs():
+    """
+    Keeps the per-stage log lines (metrics.span) out of reports and test output
+    """
+    stage_logger = logging.getLogger(metrics.__name__)
+    level = stage_logger.level
+    stage_logger.setLevel(logging.WARNING)
+    try:
+        yield
+    finally:
+        stage_logger.setLevel(level)
+
+
+@quiet_stage_logs()
+def run_workload(name, seed=DEFAULT_SEED, repeats=3):
+    clues, size = load_workload(name, seed)
+
+    place_times = []
+    finish_times = []
+    for _ in range(repeats):
+        final_grid, words_placed, place_s, finish_s = build(clues, size, seed)
+        place_times.append(place_s)
+        finish_times.append(finish_s)
+
+    # separate run for memory, tracing slows everything down
+    tracemalloc.start()
+    try:
+        build(clues, size, seed)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    cells = sum(len(row) for row in final_grid)
+    letters = sum(1 for row in final_grid for cell in row if cell["letter"] != "-")
+    place_ms = statistics.median(place_times) * 1000
+    finish_ms = statistics.median(finish_times) * 1000
+    return {
+        "words": len(clues),
+        "size": size,
+        "place_ms": round(place_ms, 2),
+        "finish_ms": round(finish_ms, 2),
+        "total_ms": round(place_ms + finish_ms, 2),
+        "peak_kb": round(peak / 1024, 1),
+        "placed_ratio": round(len(words_placed) / len(clues), 4),
+        "density": round(letters / cells, 4) if cells else 0.0,
+    }
+
+
+def run(names=None, seed=DEFAULT_SEED, repeats=3):
+    return {name: run_workload(name, seed, repeats) for name in (names or WORKLOADS)}
+
+
+def load_baselines(path=BASELINES_PATH):
+    path = Path(path)
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baselines(results, seed=DEFAULT_SEED, path=BASELINES_PATH):
+    data = {
+        "seed": seed,
+        "recorded_on": f"{platform.python_implementation()} "
+        f"{platform.python_version()} {platform.machine()}",
+        "workloads": results,
+    }
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+
+def compare(name, result, baselines, tolerances=None):
+    """
+    Returns a list of regression messages for one workload (empty if none)
+    """
+    tolerances = {**DEFAULT_TOLERANCES, **(tolerances or {})}
+    baseline = baselines.get("workloads", {}).get(name)
+    if baseline is None:
+        return []
+
+    regressions = []
+    for metric in ("total_ms", "peak_kb"):
+        limit = baseline[metric] * (1 + tolerances[metric]) + ABSOLUTE_SLACK[metric]
+        if result[metric] > limit:
+            regressions.append(
+                f"{name}: {metric} {result[metric]} > {limit:.1f} "
+                f"(baseline {baseline[metric]})"
+            )
+    for metric in ("placed_ratio", "density"):
+        limit = baseline[metric] - tolerances[metric]
+        if result[metric] < limit:
+            regressions.append(
+                f"{name}: {metric} {result[metric]} < {limit:.4f} "
+                f"(baseline {baseline[metric]})"
+            )
+    return regressions
@@ -0,0 +1,291 @@
+import math
+import random
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .single_flight import SingleFlight
+
+# nouns whose singular ends in "ie", so "movies" isn't folded to "movy"
+IE_NOUNS = frozenset("""
+    auntie beanie birdie boogie brownie calorie collie cookie genie
+    goalie hippie hoodie indie lie magpie movie newbie pie pixie prairie
+    rookie selfie smoothie sortie tie veggie yuppie zombie
+    """.split())
+
+
+def _singular(word):
+    # simple plurals only: "puppies" -> "puppy", "foxes" -> "fox", "dogs" -> "dog"
+    if len(word) <= 3:
+        return word
+    if word.endswith("ies"):
+        if word[:-1] in IE_NOUNS:
+            return word[:-1]
+        return word[:-3] + "y"
+    if word.endswith(("ches", "shes", "sses", "xes", "zes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def normalize_category(category):
+    """
+    "  Jazz   Musicians " -> "jazz musician"
+    """
+    return " ".join(_singular(word) for word in category.lower().split())
+
+
+class LRUCache:
+    """
+    Small thread-safe in-process cache with a max size and per-entry TTL
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class CachedClueGenerator:
+    """
+    Cache in front of a clue generator, keyed by normalized category and
+    number of words.
+
+    Lookups try the in-process LRU first, then the shared Django cache
+    (settings.CLUE_CACHE_ALIAS) so every worker benefits from one LLM call.
+    On a miss a larger pool of words is requested (CLUE_CACHE_POOL_FACTOR)
+    and each call samples from it, so repeat users still get different puzzles.
+    Concurrent misses for the same key are coalesced into one LLM call
+    (SingleFlight), each caller then builds its own grid from the pool.
+    """
+
+    def __init__(self, generator):
+        self._generator = generator
+        self._local = LRUCache(
+            settings.CLUE_CACHE_LOCAL_SIZE, settings.CLUE_CACHE_TIMEOUT
+        )
+        self._single_flight = SingleFlight(
+            settings.CLUE_CACHE_ALIAS,
+            lock_timeout=settings.SINGLE_FLIGHT_LOCK_TIMEOUT,
+            wait_timeout=settings.SINGLE_FLIGHT_WAIT_TIMEOUT,
+        )
+        self._stats = Counter()
+        self._stats_lock = threading.Lock()
+
+    def generate(self, category, num_words):
+        key = self.cache_key(category, num_words)
+
+        pool = self._local.get(key)
+        if pool is not None:
+            self._count("local_hits")
+        else:
+            pool = self._shared_cache().get(key)
+            if pool is not None:
+                self._count("shared_hits")
+                self._local.set(key, pool)
+            else:
+                self._count("misses")
+                # concurrent misses for the same key share one LLM call
+                pool = self._single_flight.do(
+                    key,
+                    lambda: self._fetch_pool(key, category, num_words),
+                    lambda: self._shared_cache().get(key),
+                )
+                if self._cacheable(pool):
+                    self._local.set(key, pool)
+
+        return self._sample(pool, num_words)
+
+    async def agenerate(self, category, num_words):
+        """
+        Async version of generate for the async generator path
+        """
+        key = self.cache_key(category, num_words)
+
+        pool = self._local.get(key)
+        if pool is not None:
+            self._count("local_hits")
+        else:
+            pool = await self._shared_cache().aget(key)
+            if pool is not None:
+                self._count("shared_hits")
+                self._local.set(key, pool)
+            else:
+                self._count("misses")
+                pool = await self._single_flight.ado(
+                    key,
+                    lambda: self._afetch_pool(key, category, num_words),
+                    lambda: self._shared_cache().aget(key),
+                )
+                if self._cacheable(pool):
+                    self._local.set(key, pool)
+
+        return self._sample(pool, num_words)
+
+    def generate_stream(self, category, num_words):
+        """
+        Streaming version of generate: yields (word, clue) pairs.
+        A cached pool is sampled and yielded at once. On a miss a full pool
+        is requested: its first num_words words are passed through as they
+        arrive and the pool is stored once the stream ends. Concurrent
+        misses wait for that pool and sample it, like generate.
+        """
+        key = self.cache_key(category, num_words)
+        pool = self._local.get(key)
+        if pool is None:
+            pool = self._shared_cache().get(key)
+            if pool is not None:
+                self._count("shared_hits")
+                self._local.set(key, pool)
+        else:
+            self._count("local_hits")
+
+        if pool is not None:
+            yield from self._sample(pool, num_words).items()
+            return
+
+        self._count("misses")
+        pool, streamed = yield from self._single_flight.do_stream(
+            key,
+            lambda: self._stream_pool(key, category, num_words),
+            lambda: self._shared_cache().get(key),
+        )
+        self._local.set(key, pool)
+        if not streamed:
+            yield from self._sample(pool, num_words).items()
+
+    async def agenerate_stream(self, category, num_words):
+        """
+        Async version of generate_stream
+        """
+        key = self.cache_key(category, num_words)
+        pool = self._local.get(key)
+        if pool is None:
+            pool = await self._shared_cache().aget(key)
+            if pool is not None:
+                self._count("shared_hits")
+                self._local.set(key, pool)
+        else:
+            self._count("local_hits")
+
+        if pool is not None:
+            for pair in self._sample(pool, num_words).items():
+                yield pair
+            return
+
+        self._count("misses")
+        async for pair in self._single_flight.ado_stream(
+            key,
+            lambda: self._astream_pool(key, category, num_words),
+            lambda: self._alookup(key),
+            lambda pool: self._sample(pool, num_words).items(),
+        ):
+            yield pair
+
+    def cache_key(self, category, num_words):
+        return f"clues:{normalize_category(category)}:{num_words}"
+
+    def stats(self):
+        """
+        Returns {"local_hits", "shared_hits", "misses"} since process start
+        """
+        with self._stats_lock:
+            return {
+                name: self._stats[name]
+                for name in ("local_hits", "shared_hits", "misses")
+            }
+
+    def _fetch_pool(self, key, category, num_words):
+        pool = self._generator.generate(category, self._pool_size(num_words))
+        if not self._cacheable(pool):
+            return pool
+        self._shared_cache().set(key, pool, settings.CLUE_CACHE_TIMEOUT)
+        return pool
+
+    def _stream_pool(self, key, category, num_words):
+        pool = {}
+        stream = self._generator.generate_stream(category, self._pool_size(num_words))
+        for word, clue in stream:
+            if word in pool:
+                continue
+            pool[word] = clue
+            # the rest only fills the pool for later requests
+            if len(pool) <= num_words:
+                yield word, clue
+        self._shared_cache().set(key, pool, settings.CLUE_CACHE_TIMEOUT)
+        return pool
+
+    async def _astream_pool(self, key, category, num_words):
+        pool = {}
+        stream = self._generator.agenerate_stream(category, self._pool_size(num_words))
+        async for word, clue in stream:
+            if word in pool:
+                continue
+            pool[word] = clue
+            if len(pool) <= num_words:
+                yield word, clue
+        # stored locally too, for callers in this process waiting on it
+        self._local.set(key, pool)
+        await self._shared_cache().aset(key, pool, settings.CLUE_CACHE_TIMEOUT)
+
+    async def _alookup(self, key):
+        pool = self._local.get(key)
+        if pool is None:
+            pool = await self._shared_cache().aget(key)
+        return pool
+
+    async def _afetch_pool(self, key, category, num_words):
+        pool = await self._generator.agenerate(category, self._pool_size(num_words))
+        if not self._cacheable(pool):
+            return pool
+        await self._shared_cache().aset(key, pool, settings.CLUE_CACHE_TIMEOUT)
+        return pool
+
+    def _cacheable(self, pool):
+        # a fallback's stand-in answer (clue_providers.FallbackClues) is never
+        # stored, even if a FallbackProvider ends up inside the cache
+        return not getattr(pool, "degraded", False)
+
+    def _pool_size(self, num_words):
+        return math.ceil(num_words * settings.CLUE_CACHE_POOL_FACTOR)
+
+    def _sample(self, pool, num_words):
+        # same dict type, so a degraded marker survives
+        if len(pool) <= num_words:
+            return type(pool)(pool)
+        return type(pool)(random.sample(list(pool.items()), num_words))
+
+    def _shared_cache(self):
+        return caches[settings.CLUE_CACHE_ALIAS]
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
@@ -0,0 +1,226 @@
+import json
+import random
+import threading
+from collections import defaultdict
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+
+from .clue_cache import CachedClueGenerator, normalize_category
+
+FIXTURES_DIR = Path(__file__).resolve().parent.parent / "tests"
+
+
+@lru_cache(maxsize=None)
+def load_json(path):
+    """
+    Reads a fixture or corpus file once per process
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
+class LocalClueProvider:
+    """
+    Base for providers that answer from local data without the network.
+    Same interface as CrosswordClueGenerator: generate, agenerate,
+    generate_stream and agenerate_stream return or yield {word: clue} pairs.
+    """
+
+    # local answers are cheap, there is no point caching them
+    remote = False
+
+    def generate(self, category, num_words):
+        raise NotImplementedError
+
+    async def agenerate(self, category, num_words):
+        return self.generate(category, num_words)
+
+    def generate_stream(self, category, num_words):
+        yield from self.generate(category, num_words).items()
+
+    async def agenerate_stream(self, category, num_words):
+        for pair in self.generate(category, num_words).items():
+            yield pair
+
+
+class FixtureProvider(LocalClueProvider):
+    """
+    Returns a premade word list (crossword/tests/*.json) whatever the
+    category, for development and load tests
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path or FIXTURES_DIR / "large_sample.json")
+
+    def generate(self, category, num_words):
+        return dict(load_json(self.path))
+
+
+class WordListProvider(LocalClueProvider):
+    """
+    Answers from a local corpus of {"word", "clue", "tags"} entries,
+    indexed in memory by tag.
+
+    The category is normalized (see clue_cache.normalize_category) and each
+    of its words looked up as a tag; entries matching the most tags are
+    preferred. Categories with no matching tag get a random selection.
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path or settings.CLUE_CORPUS_PATH)
+        self._index = None
+        self._entries = None
+        self._lock = threading.Lock()
+
+    def generate(self, category, num_words):
+        entries, index = self._load()
+
+        matches = defaultdict(int)
+        for tag in normalize_category(category).split():
+            for i in index.get(tag, ()):
+                matches[i] += 1
+
+        if matches:
+            # best matches first, shuffled within the same number of tags
+            ranked = list(matches)
+            random.shuffle(ranked)
+            ranked.sort(key=matches.get, reverse=True)
+        else:
+            ranked = random.sample(range(len(entries)), len(entries))
+
+        clues = {}
+        for i in ranked:
+            word, clue = entries[i]
+            clues.setdefault(word, clue)
+            if len(clues) == num_words:
+                break
+        return clues
+
+    def _load(self):
+        with self._lock:
+            if self._index is None:
+                entries = []
+                index = defaultdict(list)
+                for item in load_json(self.path):
+                    for tag in item.get("tags", ()):
+                        index[normalize_category(tag)].append(len(entries))
+                    entries.append((item["word"].upper(), item["clue"]))
+                self._entries = entries
+                self._index = dict(index)
+            return self._entries, self._index
+
+
+class FallbackClues(dict):
+    """
+    {word: clue} answered by a FallbackProvider's fallback
+    """
+
+    degraded = True
+
+
+class FallbackPair(tuple):
+    """
+    (word, clue) streamed by a FallbackProvider's fallback
+    """
+
+    degraded = True
+
+
+def is_degraded(result):
+    """
+    Whether clues or a streamed pair came from the fallback provider
+    """
+    return getattr(result, "degraded", False)
+
+
+class FallbackProvider:
+    """
+    Tries the primary provider and answers from the fallback if it fails,
+    so an LLM outage degrades to local puzzles instead of errors.
+
+    Wrap the cached primary, not the other way round, or the fallback's
+    answer is cached as if the primary had given it. Fallback answers are
+    marked degraded (FallbackClues, FallbackPair) so they aren't stocked
+    either and the page can say the puzzle is a stand-in.
+    """
+
+    def __init__(self, primary, fallback):
+        self.primary = primary
+        self.fallback = fallback
+
+    def generate(self, category, num_words):
+        try:
+            return self.primary.generate(category, num_words)
+        except Exception:
+            return FallbackClues(self.fallback.generate(category, num_words))
+
+    async def agenerate(self, category, num_words):
+        try:
+            return await self.primary.agenerate(category, num_words)
+        except Exception:
+            return FallbackClues(await self.fallback.agenerate(category, num_words))
+
+    def generate_stream(self, category, num_words):
+        yielded = False
+        try:
+            for pair in self.primary.generate_stream(category, num_words):
+                yielded = True
+                yield pair
+        except Exception:
+            # words already handed out can't be taken back
+            if yielded:
+                raise
+            for pair in self.fallback.generate_stream(category, num_words):
+                yield FallbackPair(pair)
+
+    async def agenerate_stream(self, category, num_words):
+        yielded = False
+        try:
+            async for pair in self.primary.agenerate_stream(category, num_words):
+                yielded = True
+                yield pair
+        except Exception:
+            if yielded:
+                raise
+            async for pair in self.fallback.agenerate_stream(category, num_words):
+                yield FallbackPair(pair)
+
+
+def _gemini(transport=None):
+    from .llm_service import CrosswordClueGenerator, clue_generator
+
+    if transport is not None:
+        return CrosswordClueGenerator(transport)
+    return clue_generator
+
+
+PROVIDERS = {
+    "gemini": _gemini,
+    "fixtures": FixtureProvider,
+    "wordlist": WordListProvider,
+}
+
+
+def get_provider(name=None, cached=True, transport=None):
+    """
+    Builds the clue provider configured by settings.CLUE_PROVIDER.
+
+    Remote providers are put behind the clue cache unless cached is False;
+    local ones answer in milliseconds and aren't worth caching. Without an
+    explicit name, settings.CLUE_FALLBACK_PROVIDER (if set) answers when
+    the provider fails, outside the cache. transport (an LLMTransport)
+    gives Gemini its own limits instead of the process-wide client's.
+    """
+    name = name or settings.CLUE_PROVIDER
+    if name == "gemini" and transport is not None:
+        provider = _gemini(transport)
+    else:
+        provider = PROVIDERS[name]()
+    if cached and getattr(provider, "remote", True):
+        provider = CachedClueGenerator(provider)
+    fallback = settings.CLUE_FALLBACK_PROVIDER
+    if name is None and fallback:
+        provider = FallbackProvider(provider, PROVIDERS[fallback]())
+    return provider
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from ..models import GenerationJob
+from . import metrics
+from .puzzle_pool import puzzle_pool
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationJobRunner:
+    """
+    Runs crossword generation outside the request/response cycle.
+
+    Jobs are rows in GenerationJob, so no external broker is needed: the
+    request only inserts a row and the job runs as a task on the server's
+    event loop, at most GENERATION_JOB_CONCURRENCY at a time. Generation
+    goes through the async path, so a job waiting on Gemini holds no
+    thread. A job is claimed with a conditional UPDATE so it only ever
+    runs once, even if several processes enqueue it.
+
+    A sweeper thread (start_sweeper) keeps the table healthy: it picks up
+    jobs orphaned by a restarted process, fails jobs nobody is waiting for
+    any more, and deletes finished jobs once the page has had time to
+    fetch them.
+    """
+
+    def __init__(self, puzzle_source):
+        self._puzzle_source = puzzle_source
+        # the loop jobs run on, bound by the first asubmit in this process
+        self._loop = None
+        self._slots = None
+        self._sweeper = None
+        # {pk: future} for jobs waiting or running on this process's loop
+        self._queued = {}
+        self._lock = threading.Lock()
+
+    async def asubmit(self, category, size):
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+        self.start_sweeper()
+        job = await GenerationJob.objects.acreate(category=category, size=size)
+        self._enqueue(job.pk)
+        return job
+
+    def sweep(self):
+        """
+        - fails jobs running or still pending after GENERATION_JOB_TIMEOUT,
+          the page polling them has given up by then
+        - re-enqueues pending jobs older than GENERATION_JOB_REQUEUE_AFTER
+          that this process isn't already holding (left behind by a
+          restarted or busy worker; the claim makes double runs harmless),
+          once a submit has bound the loop to run them on
+        - deletes finished jobs older than GENERATION_JOB_RETENTION
+        """
+        now = timezone.now()
+        timeout = now - timedelta(seconds=settings.GENERATION_JOB_TIMEOUT)
+        GenerationJob.objects.filter(
+            status=GenerationJob.RUNNING, started_at__lt=timeout
+        ).update(
+            status=GenerationJob.FAILED,
+            error_message="Generation timed out",
+            finished_at=now,
+        )
+        GenerationJob.objects.filter(
+            status=GenerationJob.PENDING, created_at__lt=timeout
+        ).update(
+            status=GenerationJob.FAILED,
+            error_message="Generation expired before it started",
+            finished_at=now,
+        )
+
+        requeue = now - timedelta(seconds=settings.GENERATION_JOB_REQUEUE_AFTER)
+        for pk in GenerationJob.objects.filter(
+            status=GenerationJob.PENDING, created_at__lt=requeue
+        ).values_list("pk", flat=True):
+            with self._lock:
+                if pk in self._queued:
+                    continue
+            self._enqueue(pk)
+
+        retention = now - timedelta(seconds=settings.GENERATION_JOB_RETENTION)
+        GenerationJob.objects.filter(
+            status__in=(GenerationJob.DONE, GenerationJob.FAILED),
+            finished_at__lt=retention,
+        ).delete()
+
+    def start_sweeper(self):
+        """
+        Starts the background sweep loop once per process
+        """
+        with self._lock:
+            if self._sweeper is not None:
+                return
+            self._sweeper = threading.Thread(
+                target=self._sweep_forever,
+                name="generation-job-sweeper",
+                daemon=True,
+            )
+        self._sweeper.start()
+
+    async def arun(self, pk):
+        """
+        Claims and runs a single job, recording the result or the error
+        """
+        claimed = await GenerationJob.objects.filter(
+            pk=pk, status=GenerationJob.PENDING
+        ).aupdate(status=GenerationJob.RUNNING, started_at=timezone.now())
+        if not claimed:
+            return
+
+        job = await GenerationJob.objects.aget(pk=pk)
+        metrics.stage_seconds.observe(
+            (timezone.now() - job.created_at).total_seconds(),
+            stage="job_queue",
+            size=metrics.size_label(job.size),
+        )
+        try:
+            with metrics.size_tier(job.size), metrics.span("job", job=pk):
+                puzzle = await self._puzzle_source.aget_or_generate(
+                    job.category, size=job.size
+                )
+        except Exception as e:
+            job.status = GenerationJob.FAILED
+            job.error_message = str(e)
+        else:
+            grid, across_clues, down_clues = puzzle
+            job.status = GenerationJob.DONE
+            job.degraded = getattr(puzzle, "degraded", False)
+            job.solution_grid = grid
+            job.across_clues = across_clues
+            job.down_clues = down_clues
+        job.finished_at = timezone.now()
+        await job.asave()
+
+    def _enqueue(self, pk):
+        # called on the loop by asubmit and from the sweeper thread
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                return
+            self._queued[pk] = asyncio.run_coroutine_threadsafe(
+                self._arun_queued(pk), self._loop
+            )
+
+    async def _arun_queued(self, pk):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(settings.GENERATION_JOB_CONCURRENCY)
+        try:
+            async with self._slots:
+                await self.arun(pk)
+        except Exception:
+            logger.exception("Generation job %s crashed", pk)
+        finally:
+            with self._lock:
+                self._queued.pop(pk, None)
+            await sync_to_async(close_old_connections)()
+
+    def _sweep_forever(self):
+        while True:
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("Generation job sweep failed")
+            finally:
+                close_old_connections()
+            time.sleep(settings.GENERATION_JOB_SWEEP_INTERVAL)
+
+
+generation_jobs = GenerationJobRunner(puzzle_pool)
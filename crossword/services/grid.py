@@ -0,0 +1,240 @@
+from collections import defaultdict
+
+EMPTY = "-"
+
+# Cells are keyed by row * STRIDE + col. STRIDE is far wider than any grid,
+# so keys stay unique for negative coordinates too and the cells above and
+# below are key -/+ STRIDE.
+STRIDE = 1 << 20
+
+
+def cell_key(row, col):
+    return row * STRIDE + col
+
+
+class CrosswordGrid:
+    """
+    Sparse grid used while placing words. It has no fixed size: the first
+    word goes at (0, 0) and the grid grows in any direction, optionally
+    capped at max_width x max_height cells.
+
+    Only cells holding letters are stored, keyed by cell_key(row, col):
+        letters: letter of each filled cell
+        across:  across clue number of each cell
+        down:    down clue number of each cell
+    Missing keys are black squares / no number.
+
+    positions maps each letter to the {(row, col)} cells holding it so
+    intersections can be looked up without scanning the grid, and
+    filled / intersections / bbox are kept up to date for layout scoring.
+    labels maps each cell that starts a word to its corner label
+    ("3", or "3/7" when it starts two words).
+
+    The {"letter", "across_number", "down_number", "label"} dict shape is
+    only built once at the output boundary (to_rows).
+    """
+
+    __slots__ = (
+        "max_width",
+        "max_height",
+        "letters",
+        "across",
+        "down",
+        "positions",
+        "filled",
+        "intersections",
+        "bbox",
+        "labels",
+    )
+
+    def __init__(self, max_width=None, max_height=None):
+        self.max_width = max_width
+        self.max_height = max_height
+        self.letters = {}
+        self.across = {}
+        self.down = {}
+        self.positions = defaultdict(set)
+        self.filled = 0
+        self.intersections = 0
+        # (min_row, min_col, max_row, max_col) of placed letters
+        self.bbox = None
+        self.labels = {}
+
+    def copy(self):
+        other = CrosswordGrid.__new__(CrosswordGrid)
+        other.max_width = self.max_width
+        other.max_height = self.max_height
+        other.letters = dict(self.letters)
+        other.across = dict(self.across)
+        other.down = dict(self.down)
+        other.positions = defaultdict(
+            set, {ch: set(cells) for ch, cells in self.positions.items()}
+        )
+        other.filled = self.filled
+        other.intersections = self.intersections
+        other.bbox = self.bbox
+        other.labels = dict(self.labels)
+        return other
+
+    def letter_at(self, row, col):
+        return self.letters.get(cell_key(row, col), EMPTY)
+
+    # Checks if words can be placed at given cell
+    def can_place(self, word, row, col, d, letter_index):
+        letters = self.letters
+
+        # intersection letter must match or be empty
+        existing = letters.get(row * STRIDE + col)
+        if existing is not None and existing != word[letter_index]:
+            return False
+
+        if d == "h":
+            start_c = col - letter_index
+            end_c = start_c + len(word) - 1
+
+            base = row * STRIDE
+            # cell before first and after last must be empty
+            if base + start_c - 1 in letters or base + end_c + 1 in letters:
+                return False
+
+            # check each position
+            for k, ch in enumerate(word):
+                c = start_c + k
+                i = base + c
+                existing = letters.get(i)
+
+                if c == col:
+                    # intersection must match
+                    if existing is not None and existing != ch:
+                        return False
+                else:
+                    # must be empty to place
+                    if existing is not None:
+                        return False
+                    # no vertical neighbors
+                    if i - STRIDE in letters or i + STRIDE in letters:
+                        return False
+            # size limits last, most candidates are rejected above
+            return self._fits(row, start_c, row, end_c)
+
+        else:  # 'v'
+            start_r = row - letter_index
+            end_r = start_r + len(word) - 1
+
+            # cell before first and after last vertically must be empty
+            if (start_r - 1) * STRIDE + col in letters or (
+                end_r + 1
+            ) * STRIDE + col in letters:
+                return False
+
+            for k, ch in enumerate(word):
+                r = start_r + k
+                i = r * STRIDE + col
+                existing = letters.get(i)
+
+                if r == row:
+                    if existing is not None and existing != ch:
+                        return False
+                else:
+                    if existing is not None:
+                        return False
+                    # no horizontal neighbors
+                    if i - 1 in letters or i + 1 in letters:
+                        return False
+            return self._fits(start_r, col, end_r, col)
+
+    # Place letters on grid, assuming can_place is true
+    # returns the (row, col) of the word's first letter
+    def place(self, word, row, col, d, letter_index, clue_number):
+        if d == "h":
+            start = (row, col - letter_index)
+            end = (row, start[1] + len(word) - 1)
+            dr, dc = 0, 1
+            numbers = self.across
+        else:  # 'v'
+            start = (row - letter_index, col)
+            end = (start[0] + len(word) - 1, col)
+            dr, dc = 1, 0
+            numbers = self.down
+
+        letters = self.letters
+        r, c = start
+        for ch in word:
+            i = r * STRIDE + c
+            if i not in letters:
+                letters[i] = ch
+                self.positions[ch].add((r, c))
+                self.filled += 1
+            else:
+                self.intersections += 1
+            if i not in numbers:
+                numbers[i] = clue_number
+            r += dr
+            c += dc
+
+        self.bbox = self.grow_bbox(start, end)
+        label = self.labels.get(start)
+        self.labels[start] = (
+            str(clue_number) if label is None else f"{label}/{clue_number}"
+        )
+        return start
+
+    def grow_bbox(self, start, end):
+        """
+        Bounding box after adding the cells from start to end (inclusive)
+        """
+        if self.bbox is None:
+            return (start[0], start[1], end[0], end[1])
+        min_r, min_c, max_r, max_c = self.bbox
+        return (
+            min(min_r, start[0]),
+            min(min_c, start[1]),
+            max(max_r, end[0]),
+            max(max_c, end[1]),
+        )
+
+    def _fits(self, start_r, start_c, end_r, end_c):
+        """
+        Whether the grid stays within max_width x max_height with the cells
+        from (start_r, start_c) to (end_r, end_c) added
+        """
+        if self.bbox is None:
+            return True
+        min_r, min_c, max_r, max_c = self.bbox
+        if self.max_width is not None:
+            width = max(max_c, end_c) - min(min_c, start_c) + 1
+            if width > self.max_width:
+                return False
+        if self.max_height is not None:
+            height = max(max_r, end_r) - min(min_r, start_r) + 1
+            if height > self.max_height:
+                return False
+        return True
+
+    def to_cell(self, row, col):
+        """
+        Returns the public dict shape of a single cell
+        """
+        i = row * STRIDE + col
+        cell = {
+            "letter": self.letters.get(i, EMPTY),
+            "across_number": self.across.get(i),
+            "down_number": self.down.get(i),
+        }
+        label = self.labels.get((row, col))
+        if label is not None:
+            cell["label"] = label
+        return cell
+
+    def to_rows(self):
+        """
+        Rows of cell dicts cropped to the bounding box of placed letters
+        """
+        if self.bbox is None:
+            return []
+        min_r, min_c, max_r, max_c = self.bbox
+        to_cell = self.to_cell
+        return [
+            [to_cell(r, c) for c in range(min_c, max_c + 1)]
+            for r in range(min_r, max_r + 1)
+        ]
@@ -0,0 +1,104 @@
+import multiprocessing
+import os
+import random
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from .placement import density, get_placer
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# workers start from a clean server process rather than a fork of a web
+# worker with its threads, locks, DB connections and HTTP clients
+_START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
+def _init_worker():
+    # placement engines read their budgets from Django settings
+    import django
+
+    django.setup()
+
+
+def _layout(words, size, seed):
+    """
+    Runs in a pool worker: one full layout with a fixed seed
+    """
+    return get_placer(size, random.Random(seed)).place(words)
+
+
+def get_pool():
+    """
+    Returns the process pool shared by every request in this process.
+    Created on first use so each gunicorn worker gets its own pool
+    after forking, then kept warm for later requests.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.CROSSWORD_LAYOUT_WORKERS,
+                mp_context=multiprocessing.get_context(_START_METHOD),
+                initializer=_init_worker,
+            )
+        return _pool
+
+
+def warm_pool():
+    """
+    Starts the pool's worker processes ahead of the first request
+    """
+    pool = get_pool()
+    workers = settings.CROSSWORD_LAYOUT_WORKERS or os.cpu_count() or 1
+    wait([pool.submit(int) for _ in range(workers)])
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def layout_rank(layout):
+    """
+    Sort key for (grid, words_placed): most words placed, then fill ratio
+    """
+    grid, words_placed = layout
+    return len(words_placed), density(grid.filled, grid.bbox)
+
+
+def best_layout(words, size, seeds, deadline=None):
+    """
+    Lays out the same words once per seed across the process pool and
+    returns the best (grid, words_placed).
+
+    deadline is how many seconds to wait for layouts; whatever finished by
+    then is compared and the rest is cancelled. If nothing finished, the
+    first layout to complete is used.
+    """
+    words = list(words)
+    try:
+        pool = get_pool()
+        futures = [pool.submit(_layout, words, size, seed) for seed in seeds]
+        done, pending = wait(futures, timeout=deadline)
+        if not done:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in pending:
+            future.cancel()
+        layouts = [f.result() for f in done if f.exception() is None]
+    except BrokenProcessPool:
+        # a worker died, start a fresh pool on the next request
+        _reset_pool()
+        layouts = []
+
+    if not layouts:
+        return _layout(words, size, seeds[0])
+    return max(layouts, key=layout_rank)
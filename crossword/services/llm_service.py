@@ -1,10 +1,55 @@
+import asyncio
+import contextvars
+import itertools
 import json
+import logging
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List
 
 from django.conf import settings
-from google import genai
 from pydantic import BaseModel, Field
 
+from . import metrics
+from .llm_transport import LLMTransport
+from .word_list import normalize_word
+
+logger = logging.getLogger(__name__)
+
+# share of English words starting with each letter (%), used to split the
+# alphabet into ranges holding about as many words each
+FIRST_LETTER_FREQUENCIES = {
+    "A": 5.9, "B": 5.5, "C": 9.4, "D": 6.1, "E": 4.1, "F": 4.3, "G": 3.3,
+    "H": 3.6, "I": 3.7, "J": 0.9, "K": 0.9, "L": 3.1, "M": 5.7, "N": 2.2,
+    "O": 2.4, "P": 7.7, "Q": 0.5, "R": 5.8, "S": 11.0, "T": 5.0, "U": 2.6,
+    "V": 1.5, "W": 2.0, "X": 0.1, "Y": 0.4, "Z": 0.3,
+}  # fmt: skip
+
+
+def letter_ranges(count):
+    """
+    Splits A-Z into count (first, last) letter ranges with about the same
+    share of words each, e.g. 2 -> [("A", "L"), ("M", "Z")]
+    """
+    letters = list(FIRST_LETTER_FREQUENCIES)
+    count = max(1, min(count, len(letters)))
+    target = sum(FIRST_LETTER_FREQUENCIES.values()) / count
+    ranges = []
+    first = 0
+    total = 0.0
+    for i, letter in enumerate(letters):
+        total += FIRST_LETTER_FREQUENCIES[letter]
+        ranges_left = count - len(ranges) - 1
+        letters_left = len(letters) - i - 1
+        if ranges_left and (
+            total >= target * (len(ranges) + 1) or letters_left == ranges_left
+        ):
+            ranges.append((letters[first], letter))
+            first = i + 1
+    ranges.append((letters[first], letters[-1]))
+    return ranges
+
 
 class Clue(BaseModel):
     word: str = Field(description="Crossword word")
@@ -15,43 +60,338 @@ class WordList(BaseModel):
     clues: List[Clue]
 
 
+class ClueStreamParser:
+    """
+    Incremental parser for the WordList JSON as it streams in.
+    feed() takes each text chunk and returns every Clue whose
+    {"word": ..., "clue": ...} object has been closed so far.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._object_start = None
+
+    def feed(self, text):
+        self._buffer += text
+        clues = []
+        while self._pos < len(self._buffer):
+            ch = self._buffer[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+                # depth 1 is the WordList, depth 2 a Clue inside "clues"
+                if self._depth == 2:
+                    self._object_start = self._pos
+            elif ch == "}":
+                if self._depth == 2:
+                    item = self._buffer[self._object_start : self._pos + 1]
+                    clues.append(Clue.model_validate_json(item))
+                    # drop what has been parsed
+                    self._buffer = self._buffer[self._pos + 1 :]
+                    self._pos = -1
+                self._depth -= 1
+            self._pos += 1
+        return clues
+
+
 class CrosswordClueGenerator:
     """
     This class gets crossword word/clue pairs using Geminis structured
     outputs to ensure proper JSON formatting from the LLM repsonse
+
+    Output tokens dominate the latency, so requests for at least
+    LLM_CHUNK_MIN_WORDS words (large and XL puzzles) are split into
+    concurrent calls of LLM_CHUNK_WORDS, each asked for words starting in
+    its own letter range; results are merged as they arrive. The async path
+    also sends LLM_CHUNK_SPARE extra calls and cancels the ones still
+    running once there are enough distinct words. The sync path can't
+    cancel a call once it has been sent, so it sends no spares.
+
+    One request makes at most half the transport's concurrent calls, so it
+    can't take every slot by itself. If a call fails and the others don't
+    make up the words, the request fails rather than returning a short
+    list the cache would keep.
     """
 
-    def __init__(self):
+    remote = True
+
+    def __init__(self, transport=None):
         self.model_name = settings.GEMINI_MODEL_NAME
-        self.client = genai.Client(api_key=settings.GEMINI_API_KEY)
+        # pooled HTTP, timeouts, concurrency cap, retries and hedging
+        self.transport = transport or LLMTransport.from_settings()
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._executor = None
+
+    @property
+    def client(self):
+        """
+        The Gemini client, built on first use so importing this module
+        (every manage.py command, migration and worker boot) doesn't pay
+        for the SDK import
+        """
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from google import genai
+
+                    self._client = genai.Client(
+                        api_key=settings.GEMINI_API_KEY,
+                        http_options=self.transport.http_options(),
+                    )
+        return self._client
 
     def generate(self, category, num_words):
+        chunks = self._chunks(num_words, spare=0)
+        if len(chunks) == 1:
+            return self._generate_one(category, num_words)
+
+        # each call runs in a copy of this context so its spans keep the size
+        executor = self._chunk_executor()
+        futures = [
+            executor.submit(
+                contextvars.copy_context().run,
+                self._generate_one,
+                category,
+                words,
+                letters,
+            )
+            for words, letters in chunks
+        ]
+        clues = {}
+        error = None
+        try:
+            for future in as_completed(futures):
+                try:
+                    self._merge(clues, future.result())
+                except Exception as e:
+                    error = e
+                    continue
+                if len(clues) >= num_words:
+                    break
+        finally:
+            # calls that haven't started are dropped, a blocking request
+            # already sent can't be cancelled and finishes in the background
+            for future in futures:
+                future.cancel()
+        return self._take(clues, num_words, error)
+
+    async def agenerate(self, category, num_words):
+        """
+        Same as generate, using the SDK's async client so the event loop
+        is free while waiting on Gemini
+        """
+        chunks = self._chunks(num_words, spare=settings.LLM_CHUNK_SPARE)
+        if len(chunks) == 1:
+            return await self._agenerate_one(category, num_words)
+
+        tasks = [
+            asyncio.ensure_future(self._agenerate_one(category, words, letters))
+            for words, letters in chunks
+        ]
+        clues = {}
+        error = None
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    self._merge(clues, await next_done)
+                except Exception as e:
+                    error = e
+                    continue
+                if len(clues) >= num_words:
+                    break
+        finally:
+            surplus = [task for task in tasks if not task.done()]
+            for task in surplus:
+                task.cancel()
+            if surplus:
+                logger.info("Cancelled %s surplus Gemini calls", len(surplus))
+        return self._take(clues, num_words, error)
+
+    def _generate_one(self, category, num_words, letters=None):
+        prompt = self._build_prompt(category, num_words, letters)
+        try:
+            logger.info(
+                "Calling Gemini API model=%s words=%s", self.model_name, num_words
+            )
+            with metrics.span("llm_call", words=num_words):
+                response = self.transport.call(
+                    lambda: self.client.models.generate_content(
+                        model=self.model_name,
+                        contents=prompt,
+                        config=self._build_config(),
+                    ),
+                    key=num_words,
+                )
+            metrics.record_usage(response.usage_metadata)
+            with metrics.span("parse"):
+                return self._parse_json(response)
+
+        except Exception as e:
+            raise RuntimeError(f"Gemini API error: {e}")
+
+    async def _agenerate_one(self, category, num_words, letters=None):
+        prompt = self._build_prompt(category, num_words, letters)
+        try:
+            logger.info(
+                "Calling Gemini API model=%s words=%s", self.model_name, num_words
+            )
+            with metrics.span("llm_call", words=num_words):
+                response = await self.transport.acall(
+                    lambda: self.client.aio.models.generate_content(
+                        model=self.model_name,
+                        contents=prompt,
+                        config=self._build_config(),
+                    ),
+                    key=num_words,
+                )
+            metrics.record_usage(response.usage_metadata)
+            with metrics.span("parse"):
+                return self._parse_json(response)
+
+        except Exception as e:
+            raise RuntimeError(f"Gemini API error: {e}")
+
+    def generate_stream(self, category, num_words):
+        """
+        Yields (word, clue) pairs as soon as each one has fully arrived
+        """
         prompt = self._build_prompt(category, num_words)
+        parser = ClueStreamParser()
         try:
-            print("Calling Gemini API")
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=prompt,
-                config={
-                    "response_mime_type": "application/json",
-                    "response_json_schema": WordList.model_json_schema(),
-                },
+            logger.info(
+                "Calling Gemini API (streaming) model=%s words=%s",
+                self.model_name,
+                num_words,
             )
-            return self._parse_json(response)
+            # words are handed out as they arrive, so a stream is neither
+            # retried nor hedged, it only takes a concurrency slot
+            usage = None
+            with self.transport.slot():
+                for chunk in self.client.models.generate_content_stream(
+                    model=self.model_name,
+                    contents=prompt,
+                    config=self._build_config(),
+                ):
+                    # the running totals, complete on the last chunk
+                    usage = chunk.usage_metadata or usage
+                    for clue in parser.feed(chunk.text or ""):
+                        yield self._clean_word(clue.word), clue.clue
+            metrics.record_usage(usage)
 
         except Exception as e:
             raise RuntimeError(f"Gemini API error: {e}")
 
-    def _build_prompt(self, category, num_words):
-        return f"""
+    async def agenerate_stream(self, category, num_words):
+        """
+        Async version of generate_stream, on the SDK's async client
+        """
+        prompt = self._build_prompt(category, num_words)
+        parser = ClueStreamParser()
+        try:
+            logger.info(
+                "Calling Gemini API (streaming) model=%s words=%s",
+                self.model_name,
+                num_words,
+            )
+            usage = None
+            async with self.transport.aslot():
+                stream = await self.client.aio.models.generate_content_stream(
+                    model=self.model_name,
+                    contents=prompt,
+                    config=self._build_config(),
+                )
+                async for chunk in stream:
+                    usage = chunk.usage_metadata or usage
+                    for clue in parser.feed(chunk.text or ""):
+                        yield self._clean_word(clue.word), clue.clue
+            metrics.record_usage(usage)
+
+        except Exception as e:
+            raise RuntimeError(f"Gemini API error: {e}")
+
+    def _chunks(self, num_words, spare):
+        """
+        (words, letter range or None) for each call making up a request,
+        with spare extra calls when it is split
+        """
+        size = settings.LLM_CHUNK_WORDS
+        if not size or num_words < settings.LLM_CHUNK_MIN_WORDS or num_words <= size:
+            return [(num_words, None)]
+        max_calls = max(1, self.transport.max_concurrency // 2)
+        needed = min(math.ceil(num_words / size), max_calls)
+        if needed == 1:
+            return [(num_words, None)]
+        spare = max(0, min(spare, max_calls - needed))
+        words = math.ceil(num_words / needed)
+        ranges = letter_ranges(needed + spare)
+        return [(words, letters) for letters in ranges]
+
+    def _merge(self, clues, chunk):
+        # the letter ranges keep overlap low, but calls can still repeat words
+        seen = {normalize_word(word) for word in clues}
+        for word, clue in chunk.items():
+            key = normalize_word(word)
+            if key and key not in seen:
+                seen.add(key)
+                clues[word] = clue
+
+    def _take(self, clues, num_words, error):
+        if not clues:
+            raise error or RuntimeError("Gemini API error: no words returned")
+        if error is not None and len(clues) < num_words:
+            # a failed call left the list short, don't pass it off as complete
+            raise error
+        return dict(itertools.islice(clues.items(), num_words))
+
+    def _chunk_executor(self):
+        with self._client_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.LLM_MAX_CONCURRENCY,
+                    thread_name_prefix="llm-chunk",
+                )
+            return self._executor
+
+    def _build_config(self):
+        return {
+            "response_mime_type": "application/json",
+            "response_json_schema": WordList.model_json_schema(),
+        }
+
+    def _build_prompt(self, category, num_words, letters=None):
+        prompt = f"""
             You are a crossword generator. Give me { num_words } words and short clues that follow the category: { category }. 
             Do NOT generate any additonal information other than the Word and its clue. 
             Do NOT add the number of letters to the end of the clues
         """
+        if letters is not None:
+            first, last = letters
+            start = first if first == last else f"a letter from { first } to { last }"
+            prompt += f"""    Only give words starting with { start }.
+        """
+        return prompt
 
     def _parse_json(self, response):
         output = json.loads(response.text)
-        return {item["word"].replace(" ", ""): item["clue"] for item in output["clues"]}
+        return {
+            self._clean_word(item["word"]): item["clue"] for item in output["clues"]
+        }
+
+    def _clean_word(self, word):
+        return word.replace(" ", "")
 
 
 clue_generator = CrosswordClueGenerator()
@@ -0,0 +1,460 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import asynccontextmanager, contextmanager
+
+from django.conf import settings
+
+# google.genai.errors.APIError codes worth another attempt
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+def is_retryable(error):
+    import httpx
+
+    if isinstance(error, httpx.TransportError):
+        # connect/read timeouts, dropped connections
+        return True
+    return getattr(error, "code", None) in RETRYABLE_STATUS_CODES
+
+
+class LatencyTracker:
+    """
+    Recent successful call durations, for the hedging threshold
+    """
+
+    def __init__(self, window=200, min_samples=20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def p95(self):
+        """
+        Returns the 95th percentile in seconds, or None until min_samples
+        calls have been seen
+        """
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            samples = sorted(self._samples)
+        return samples[int(0.95 * (len(samples) - 1))]
+
+
+class RateLimiter:
+    """
+    Spaces out requests to at most `rate` per minute (0 = no limit), shared
+    by threads and event loops
+    """
+
+    def __init__(self, rate):
+        self.interval = 60 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire(self):
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _reserve(self):
+        if not self.interval:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        return delay
+
+
+class _Waiter:
+    __slots__ = ("loop", "future", "event", "granted")
+
+    def __init__(self, loop=None, future=None, event=None):
+        self.loop = loop
+        self.future = future
+        self.event = event
+        # set under the lock when a release hands this waiter its slot
+        self.granted = False
+
+
+class SharedSemaphore:
+    """
+    Bounded semaphore that threads and event loops can both wait on.
+
+    acquire() is threading.BoundedSemaphore's; aacquire() waits on a future
+    of the caller's loop instead of a thread or a polling loop. A release
+    hands the slot straight to the longest waiting caller, whichever kind.
+    """
+
+    def __init__(self, value):
+        self._initial = value
+        self._value = value
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self, blocking=True, timeout=None):
+        with self._lock:
+            if self._take():
+                return True
+            if not blocking:
+                return False
+            waiter = _Waiter(event=threading.Event())
+            self._waiters.append(waiter)
+        if waiter.event.wait(timeout):
+            return True
+        return self._give_up(waiter)
+
+    async def aacquire(self, timeout=None):
+        """
+        Waits up to timeout seconds (None for no limit), returns whether a
+        slot was taken
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._take():
+                return True
+            waiter = _Waiter(loop=loop, future=loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter.future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return self._give_up(waiter)
+        except asyncio.CancelledError:
+            # a slot handed over just as we were cancelled goes to the next
+            if self._give_up(waiter):
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if waiter.event is not None:
+                    waiter.granted = True
+                    waiter.event.set()
+                    return
+                try:
+                    waiter.loop.call_soon_threadsafe(self._wake, waiter.future)
+                except RuntimeError:
+                    # its loop is closed, nobody is left to take the slot
+                    continue
+                waiter.granted = True
+                return
+            if self._value >= self._initial:
+                raise ValueError("Semaphore released too many times")
+            self._value += 1
+
+    def _take(self):
+        # callers already waiting go first
+        if self._value and not self._waiters:
+            self._value -= 1
+            return True
+        return False
+
+    def _give_up(self, waiter):
+        # True if the slot arrived anyway, before the waiter could leave
+        with self._lock:
+            if waiter.granted:
+                return True
+            self._waiters.remove(waiter)
+            return False
+
+    @staticmethod
+    def _wake(future):
+        if not future.done():
+            future.set_result(None)
+
+
+class LLMTransport:
+    """
+    Shared HTTP transport and call policy for the LLM clients.
+
+    - one pooled httpx client (sync and async) per process with keep-alive,
+      separate connect and read timeouts
+    - at most max_concurrency requests in flight, callers wait up to
+      acquire_timeout for a slot (None waits as long as it takes)
+    - at most rate_limit requests started per minute (0 = no limit),
+      counting every retry, hedge and stream
+    - retryable errors (timeouts, 429, 5xx) are retried with full-jitter
+      exponential backoff
+    - once there are enough samples for a key, a request still running
+      past that key's p95 latency gets a second (hedged) request if a slot
+      is free; the first to succeed wins
+
+    httpx and the SDK are only imported when http_options() is first called.
+    """
+
+    def __init__(
+        self,
+        connect_timeout,
+        read_timeout,
+        max_connections,
+        max_concurrency,
+        acquire_timeout,
+        retry_attempts,
+        retry_base_delay,
+        retry_max_delay,
+        hedge=True,
+        hedge_min_samples=20,
+        rate_limit=0,
+    ):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self.acquire_timeout = acquire_timeout
+        self.retry_attempts = max(1, retry_attempts)
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.rate_limiter = RateLimiter(rate_limit)
+
+        self._slots = SharedSemaphore(max_concurrency)
+        self._latency = {}
+        self._executor = None
+        self._options = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, **overrides):
+        """
+        Transport configured from the LLM_* settings, overrides are passed
+        to __init__ as they are
+        """
+        options = dict(
+            connect_timeout=settings.LLM_CONNECT_TIMEOUT,
+            read_timeout=settings.LLM_READ_TIMEOUT,
+            max_connections=settings.LLM_MAX_CONNECTIONS,
+            max_concurrency=settings.LLM_MAX_CONCURRENCY,
+            acquire_timeout=settings.LLM_ACQUIRE_TIMEOUT,
+            retry_attempts=settings.LLM_RETRY_ATTEMPTS,
+            retry_base_delay=settings.LLM_RETRY_BASE_DELAY,
+            retry_max_delay=settings.LLM_RETRY_MAX_DELAY,
+            hedge=settings.LLM_HEDGE,
+            hedge_min_samples=settings.LLM_HEDGE_MIN_SAMPLES,
+            rate_limit=settings.LLM_RATE_LIMIT,
+        )
+        options.update(overrides)
+        return cls(**options)
+
+    def http_options(self):
+        """
+        genai HttpOptions using the shared pooled clients
+        """
+        with self._lock:
+            if self._options is None:
+                self._options = self._build_http_options()
+            return self._options
+
+    def call(self, fn, key=None):
+        """
+        Runs fn() (one blocking LLM request) under the concurrency cap,
+        with retries and hedging. key groups calls of similar expected
+        latency, e.g. the number of words requested.
+        """
+        for attempt in range(self.retry_attempts):
+            try:
+                return self._hedged_call(fn, key)
+            except Exception as e:
+                if attempt == self.retry_attempts - 1 or not is_retryable(e):
+                    raise
+                time.sleep(self._backoff(attempt))
+
+    async def acall(self, afn, key=None):
+        """
+        Async version of call, afn() returns a coroutine
+        """
+        for attempt in range(self.retry_attempts):
+            try:
+                return await self._ahedged_call(afn, key)
+            except Exception as e:
+                if attempt == self.retry_attempts - 1 or not is_retryable(e):
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+
+    @contextmanager
+    def slot(self):
+        """
+        Holds one concurrency slot, for calls that can't be retried or
+        hedged (streams)
+        """
+        self._acquire()
+        try:
+            self.rate_limiter.wait()
+            yield
+        finally:
+            self._slots.release()
+
+    @asynccontextmanager
+    async def aslot(self):
+        """
+        Async version of slot
+        """
+        await self._aacquire()
+        try:
+            await self.rate_limiter.acquire()
+            yield
+        finally:
+            self._slots.release()
+
+    def _hedged_call(self, fn, key):
+        self._acquire()
+        threshold = self._hedge_threshold(key)
+        if threshold is None:
+            try:
+                return self._timed(fn, key)
+            finally:
+                self._slots.release()
+
+        executor = self._hedge_executor()
+        primary = executor.submit(self._timed, fn, key)
+        primary.add_done_callback(lambda _: self._slots.release())
+        futures = [primary]
+
+        done, _ = wait(futures, timeout=threshold)
+        if not done and self._slots.acquire(blocking=False):
+            # slower than usual: race a second request, the loser finishes in
+            # the background (a blocking request can't be cancelled)
+            hedge = executor.submit(self._timed, fn, key)
+            hedge.add_done_callback(lambda _: self._slots.release())
+            futures.append(hedge)
+
+        pending = set(futures)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    async def _ahedged_call(self, afn, key):
+        await self._aacquire()
+        primary = asyncio.ensure_future(self._atimed(afn, key))
+        primary.add_done_callback(lambda _: self._slots.release())
+        tasks = [primary]
+
+        try:
+            threshold = self._hedge_threshold(key)
+            if threshold is not None:
+                done, _ = await asyncio.wait(tasks, timeout=threshold)
+                if not done and self._slots.acquire(blocking=False):
+                    hedge = asyncio.ensure_future(self._atimed(afn, key))
+                    hedge.add_done_callback(lambda _: self._slots.release())
+                    tasks.append(hedge)
+
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # the winner is back (or the caller gave up), cancel the rest
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def _timed(self, fn, key):
+        # paced with the slot held, so a limited transport doesn't also
+        # let more requests queue up than it has slots
+        self.rate_limiter.wait()
+        start = time.monotonic()
+        result = fn()
+        self._tracker(key).record(time.monotonic() - start)
+        return result
+
+    async def _atimed(self, afn, key):
+        await self.rate_limiter.acquire()
+        start = time.monotonic()
+        result = await afn()
+        self._tracker(key).record(time.monotonic() - start)
+        return result
+
+    def _hedge_threshold(self, key):
+        if not self.hedge:
+            return None
+        return self._tracker(key).p95()
+
+    def _tracker(self, key):
+        with self._lock:
+            tracker = self._latency.get(key)
+            if tracker is None:
+                tracker = LatencyTracker(min_samples=self.hedge_min_samples)
+                self._latency[key] = tracker
+            return tracker
+
+    def _acquire(self):
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise RuntimeError("Too many LLM requests in flight")
+
+    async def _aacquire(self):
+        # the same slots as the sync path, so the cap covers both
+        if not await self._slots.aacquire(timeout=self.acquire_timeout):
+            raise RuntimeError("Too many LLM requests in flight")
+
+    def _backoff(self, attempt):
+        return random.uniform(
+            0, min(self.retry_max_delay, self.retry_base_delay * 2**attempt)
+        )
+
+    def _hedge_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrency, thread_name_prefix="llm-call"
+                )
+            return self._executor
+
+    def _build_http_options(self):
+        import httpx
+        from google.genai import types
+
+        timeout = httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_connections,
+        )
+
+        # the SDK passes a single float timeout on every request, which would
+        # also apply to connecting; put the split connect/read timeout back
+        def set_timeout(request):
+            request.extensions["timeout"] = timeout.as_dict()
+
+        async def aset_timeout(request):
+            set_timeout(request)
+
+        return types.HttpOptions(
+            # milliseconds; also sent to the API as the server-side deadline
+            timeout=int(self.read_timeout * 1000),
+            httpx_client=httpx.Client(
+                timeout=timeout,
+                limits=limits,
+                event_hooks={"request": [set_timeout]},
+            ),
+            httpx_async_client=httpx.AsyncClient(
+                timeout=timeout,
+                limits=limits,
+                event_hooks={"request": [aset_timeout]},
+            ),
+        )
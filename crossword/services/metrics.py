@@ -0,0 +1,224 @@
+"""
+In-process metrics for the generation pipeline, exported in the
+Prometheus text format at /metrics, plus structured (logfmt) stage logs.
+
+Each worker process keeps its own values; scrape every worker (or sum
+them) for totals.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from .placement import SIZES
+
+logger = logging.getLogger(__name__)
+
+# seconds, from cache hits up to slow XL generations
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120,
+)  # fmt: skip
+RATIO_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+
+# size tier of the puzzle being built, so nested stages are labelled with it
+_size = ContextVar("crossword_size", default="unknown")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in labels
+    )
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+        ]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                labels = _format_labels(zip(self.labelnames, key))
+                lines.append(f"{self.name}{labels} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # key -> [bucket counts..., +Inf count, sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = [0] * (len(self.buckets) + 1) + [0.0]
+                self._values[key] = counts
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-2] += 1
+            counts[-1] += value
+
+    def collect(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            items = sorted((key, list(counts)) for key, counts in self._values.items())
+        for key, counts in items:
+            labels = list(zip(self.labelnames, key))
+            for bound, count in zip(self.buckets, counts):
+                le = _format_labels(labels + [("le", bound)])
+                lines.append(f"{self.name}_bucket{le} {count}")
+            le = _format_labels(labels + [("le", "+Inf")])
+            lines.append(f"{self.name}_bucket{le} {counts[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {counts[-2]}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {counts[-1]}")
+        return lines
+
+
+stage_seconds = Histogram(
+    "crossword_stage_seconds",
+    "Time spent in each generation stage",
+    ("stage", "size"),
+)
+llm_tokens = Counter(
+    "crossword_llm_tokens_total",
+    "Tokens used by LLM calls",
+    ("kind", "size"),
+)
+words = Counter(
+    "crossword_words_total",
+    "Words requested from the clue provider, received, dropped as unusable "
+    "or duplicate, and placed on the grid",
+    ("kind", "size"),
+)
+placed_ratio = Histogram(
+    "crossword_placed_ratio",
+    "Share of received words placed on the grid",
+    ("size",),
+    buckets=RATIO_BUCKETS,
+)
+stage_errors = Counter(
+    "crossword_stage_errors_total",
+    "Generation stages that raised",
+    ("stage", "size"),
+)
+
+REGISTRY = (stage_seconds, stage_errors, llm_tokens, words, placed_ratio)
+
+
+def size_label(size):
+    """
+    The size label for a size tier; anything else is "other", so request
+    input can't add label series
+    """
+    return size if size in SIZES else "other"
+
+
+@contextmanager
+def size_tier(size):
+    """
+    Labels every stage inside the block with this size tier
+    """
+    token = _size.set(size_label(size))
+    try:
+        yield
+    finally:
+        _size.reset(token)
+
+
+@contextmanager
+def span(stage, **fields):
+    """
+    Times the block into crossword_stage_seconds{stage, size} and logs
+    one logfmt line for it. Extra fields are added to the log line.
+    """
+    size = _size.get()
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except BaseException:
+        status = "error"
+        stage_errors.inc(stage=stage, size=size)
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        stage_seconds.observe(duration, stage=stage, size=size)
+        extra = "".join(f" {name}={value}" for name, value in fields.items())
+        logger.info(
+            "stage=%s size=%s status=%s duration_ms=%.1f%s",
+            stage,
+            size,
+            status,
+            duration * 1000,
+            extra,
+        )
+
+
+def record_words(requested=None, received=None, dropped=None, placed=None):
+    size = _size.get()
+    for kind, count in (
+        ("requested", requested),
+        ("received", received),
+        ("dropped", dropped),
+        ("placed", placed),
+    ):
+        if count is not None:
+            words.inc(count, kind=kind, size=size)
+    if received and placed is not None:
+        placed_ratio.observe(placed / received, size=size)
+
+
+def record_usage(usage):
+    """
+    Adds a Gemini response's usage_metadata to crossword_llm_tokens_total
+    """
+    if usage is None:
+        return
+    size = _size.get()
+    for kind, attr in (
+        ("prompt", "prompt_token_count"),
+        ("output", "candidates_token_count"),
+        ("thoughts", "thoughts_token_count"),
+    ):
+        count = getattr(usage, attr, None)
+        if count:
+            llm_tokens.inc(count, kind=kind, size=size)
+
+
+def render():
+    """
+    All metrics in the Prometheus text exposition format
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
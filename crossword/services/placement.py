@@ -0,0 +1,404 @@
+import random
+import time
+
+from django.conf import settings
+
+from .grid import STRIDE, CrosswordGrid, cell_key
+
+# crossword sizes offered on the home page
+SIZES = ("small", "medium", "large", "XL")
+
+# Engine, search budget and grid limits per crossword size.
+# Override with settings.CROSSWORD_PLACEMENT_BUDGETS (same shape).
+#   beam_width:  number of partial grids kept after each word
+#   time_budget: seconds of search before the rest is placed greedily
+#   node_budget: candidate placements scored before the rest is placed greedily
+#   max_width / max_height: largest grid in cells, None for no limit
+DEFAULT_PLACEMENT_BUDGETS = {
+    "small": {
+        "engine": "beam",
+        "beam_width": 8,
+        "time_budget": 0.5,
+        "node_budget": 40_000,
+        "max_width": 25,
+        "max_height": 25,
+    },
+    "medium": {
+        "engine": "beam",
+        "beam_width": 6,
+        "time_budget": 1.0,
+        "node_budget": 80_000,
+        "max_width": 35,
+        "max_height": 35,
+    },
+    "large": {
+        "engine": "beam",
+        "beam_width": 4,
+        "time_budget": 1.5,
+        "node_budget": 120_000,
+        "max_width": 45,
+        "max_height": 45,
+    },
+    "XL": {
+        "engine": "beam",
+        "beam_width": 4,
+        "time_budget": 2.0,
+        "node_budget": 150_000,
+        "max_width": 50,
+        "max_height": 50,
+    },
+    "default": {
+        "engine": "beam",
+        "beam_width": 6,
+        "time_budget": 1.0,
+        "node_budget": 80_000,
+        "max_width": 35,
+        "max_height": 35,
+    },
+}
+
+# layout score weights: placed words dominate, then crossings, then density
+WORD_WEIGHT = 100
+INTERSECTION_WEIGHT = 10
+COMPACTNESS_WEIGHT = 50
+
+
+def density(filled, bbox):
+    """
+    Share of the bounding box covered by letters (0 - 1)
+    """
+    if bbox is None:
+        return 0.0
+    min_r, min_c, max_r, max_c = bbox
+    return filled / ((max_r - min_r + 1) * (max_c - min_c + 1))
+
+
+def score_layout(grid, words_placed):
+    return (
+        WORD_WEIGHT * len(words_placed)
+        + INTERSECTION_WEIGHT * grid.intersections
+        + COMPACTNESS_WEIGHT * density(grid.filled, grid.bbox)
+    )
+
+
+def score_move(grid, words_placed, word, move):
+    """
+    score_layout of the grid as it would be after the move
+    """
+    row, col, d, letter_index = move
+    if d == "h":
+        start = (row, col - letter_index)
+        end = (row, start[1] + len(word) - 1)
+        step = 1
+    else:
+        start = (row - letter_index, col)
+        end = (start[0] + len(word) - 1, col)
+        step = STRIDE
+
+    letters = grid.letters
+    i = cell_key(*start)
+    crossings = 0
+    for _ in word:
+        if i in letters:
+            crossings += 1
+        i += step
+
+    filled = grid.filled + len(word) - crossings
+    return (
+        WORD_WEIGHT * (len(words_placed) + 1)
+        + INTERSECTION_WEIGHT * (grid.intersections + crossings)
+        + COMPACTNESS_WEIGHT * density(filled, grid.grow_bbox(start, end))
+    )
+
+
+def start_grid(first_word, max_width=None, max_height=None):
+    """
+    New grid with first_word placed across at (0, 0) as clue 1
+    """
+    grid = CrosswordGrid(max_width, max_height)
+    first_letter = grid.place(first_word, 0, 0, "h", 0, 1)
+    words_placed = {
+        first_word: {"number": 1, "direction": "h", "first_letter": first_letter}
+    }
+    return grid, words_placed
+
+
+def apply_move(grid, words_placed, word, move):
+    """
+    Places word on grid and records it in words_placed (both updated in place)
+    """
+    row, col, d, letter_index = move
+    number = len(words_placed) + 1
+    first_letter = grid.place(word, row, col, d, letter_index, number)
+    words_placed[word] = {
+        "number": number,
+        "direction": d,
+        "first_letter": first_letter,
+    }
+
+
+def candidates(grid, word, directions=("h", "v")):
+    """
+    Yields (row, col, direction, letter_index) for every legal placement
+    of word that crosses a letter already on the grid
+    """
+    for letter_index, letter in enumerate(word):
+        for row, col in sorted(grid.positions.get(letter, ())):
+            for d in directions:
+                if grid.can_place(word, row, col, d, letter_index):
+                    yield row, col, d, letter_index
+
+
+def best_move(grid, words_placed, word):
+    """
+    The highest scoring legal move for word, or None if it can't be placed
+    """
+    best = None
+    for move in candidates(grid, word):
+        score = score_move(grid, words_placed, word, move)
+        if best is None or score > best[0]:
+            best = (score, move)
+    return None if best is None else best[1]
+
+
+class Placer:
+    """
+    Base placement engine: places the longest word across an empty grid
+    and leaves the rest of the words to _place_words.
+
+    rng is a random.Random so layouts can be reproduced from a seed.
+    The grid grows as needed, up to max_width x max_height if given.
+    """
+
+    def __init__(self, rng=None, max_width=None, max_height=None):
+        self.rng = rng or random.Random()
+        self.max_width = max_width
+        self.max_height = max_height
+
+    def place(self, words):
+        """
+        Returns:
+            grid (CrosswordGrid),
+            words_placed: {
+                word: {
+                    "number": clue number,
+                    "direction": "h" or "v",
+                    "first_letter": (row, col),
+                }
+            }
+        """
+        words = list(words)
+
+        # find the longest word to place first
+        first_word = max(words, key=len)
+        words.remove(first_word)
+        grid, words_placed = start_grid(first_word, self.max_width, self.max_height)
+        return self._place_words(grid, words, words_placed)
+
+    def _place_words(self, grid, words, words_placed):
+        raise NotImplementedError
+
+
+class GreedyPlacer(Placer):
+    """
+    Single pass: each word gets one random direction and the first legal
+    intersection, or is dropped
+    """
+
+    def _place_words(self, grid, words, words_placed):
+        for word in words:
+            direction = self.rng.choice(["h", "v"])
+            move = next(candidates(grid, word, (direction,)), None)
+            if move is not None:
+                apply_move(grid, words_placed, word, move)
+        return grid, words_placed
+
+
+class BeamSearchPlacer(Placer):
+    """
+    Keeps the beam_width best partial grids after each word, trying every
+    legal intersection in both directions. Once the time or node budget is
+    spent the best grid so far is finished with GreedyPlacer.
+
+    A word with no legal move when its turn comes is skipped; up to
+    retry_passes passes over the skipped words are made on the final grid,
+    since later words may have opened an intersection for them.
+    """
+
+    def __init__(
+        self,
+        beam_width=6,
+        time_budget=1.0,
+        node_budget=80_000,
+        rng=None,
+        max_width=None,
+        max_height=None,
+        retry_passes=2,
+    ):
+        super().__init__(rng, max_width, max_height)
+        self.beam_width = beam_width
+        self.time_budget = time_budget
+        self.node_budget = node_budget
+        self.retry_passes = retry_passes
+
+    def _place_words(self, grid, words, words_placed):
+        deadline = time.monotonic() + self.time_budget
+        nodes = 0
+        beam = [(grid, words_placed)]
+
+        for n, word in enumerate(words):
+            if nodes >= self.node_budget or time.monotonic() >= deadline:
+                grid, words_placed = self._best(beam)
+                greedy = GreedyPlacer(self.rng)
+                grid, words_placed = greedy._place_words(grid, words[n:], words_placed)
+                return self._retry_skipped(grid, words, words_placed)
+
+            # score every move from every grid in the beam without copying
+            scored = []
+            for state_index, (state_grid, state_words) in enumerate(beam):
+                moved = False
+                for move in candidates(state_grid, word):
+                    moved = True
+                    nodes += 1
+                    score = score_move(state_grid, state_words, word, move)
+                    scored.append((score, self.rng.random(), state_index, move))
+                if not moved:
+                    # word doesn't fit this grid, carry it over unchanged
+                    score = score_layout(state_grid, state_words)
+                    scored.append((score, self.rng.random(), state_index, None))
+
+            scored.sort(key=lambda s: (s[0], s[1]), reverse=True)
+            next_beam = []
+            for _, _, state_index, move in scored[: self.beam_width]:
+                state_grid, state_words = beam[state_index]
+                if move is None:
+                    next_beam.append((state_grid, state_words))
+                    continue
+                child_grid = state_grid.copy()
+                child_words = dict(state_words)
+                apply_move(child_grid, child_words, word, move)
+                next_beam.append((child_grid, child_words))
+            beam = next_beam
+
+        grid, words_placed = self._best(beam)
+        return self._retry_skipped(grid, words, words_placed)
+
+    def _best(self, beam):
+        return max(beam, key=lambda state: score_layout(*state))
+
+    def _retry_skipped(self, grid, words, words_placed):
+        skipped = [word for word in words if word not in words_placed]
+        for _ in range(self.retry_passes):
+            placed = False
+            for word in list(skipped):
+                move = best_move(grid, words_placed, word)
+                if move is not None:
+                    apply_move(grid, words_placed, word, move)
+                    skipped.remove(word)
+                    placed = True
+            if not placed:
+                break
+        return grid, words_placed
+
+
+class IncrementalPlacer:
+    """
+    Places words one at a time as they stream in from the LLM.
+
+    The first `warmup` words are buffered so the longest of them can
+    anchor the grid; after that every word is placed on arrival at its
+    best scoring intersection. Words that don't fit yet are retried after
+    each later placement, since new letters open new intersections.
+    The grid grows as needed, up to max_width x max_height if given.
+    """
+
+    def __init__(self, warmup=5, max_width=None, max_height=None):
+        self.warmup = warmup
+        self.max_width = max_width
+        self.max_height = max_height
+        self.grid = None
+        self.words_placed = {}
+        self._buffer = []
+        self._pending = []
+
+    def add(self, word):
+        if word in self.words_placed:
+            return
+        if self.grid is None:
+            self._buffer.append(word)
+            if len(self._buffer) >= self.warmup:
+                self._start()
+            return
+        if self._try_place(word):
+            self._retry_pending()
+        else:
+            self._pending.append(word)
+
+    def finish(self):
+        """
+        Returns (grid, words_placed) once the stream has ended
+        """
+        if self.grid is None:
+            if not self._buffer:
+                raise ValueError("No words to place")
+            self._start()
+        return self.grid, self.words_placed
+
+    def _start(self):
+        words = sorted(self._buffer, key=len, reverse=True)
+        self._buffer = []
+        self.grid, self.words_placed = start_grid(
+            words[0], self.max_width, self.max_height
+        )
+        for word in words[1:]:
+            self.add(word)
+
+    def _try_place(self, word):
+        move = best_move(self.grid, self.words_placed, word)
+        if move is None:
+            return False
+
+        apply_move(self.grid, self.words_placed, word, move)
+        return True
+
+    def _retry_pending(self):
+        placed = True
+        while placed and self._pending:
+            placed = False
+            for word in list(self._pending):
+                if self._try_place(word):
+                    self._pending.remove(word)
+                    placed = True
+
+
+ENGINES = {
+    "greedy": GreedyPlacer,
+    "beam": BeamSearchPlacer,
+}
+
+
+def _budget(size):
+    budgets = getattr(
+        settings, "CROSSWORD_PLACEMENT_BUDGETS", DEFAULT_PLACEMENT_BUDGETS
+    )
+    return dict(budgets.get(size, budgets["default"]))
+
+
+def get_placer(size, rng=None):
+    """
+    Builds the placement engine configured for a crossword size
+    """
+    options = _budget(size)
+    engine = ENGINES[options.pop("engine", "beam")]
+    return engine(rng=rng, **options)
+
+
+def grid_limits(size):
+    """
+    {"max_width", "max_height"} configured for a crossword size
+    """
+    options = _budget(size)
+    return {
+        "max_width": options.get("max_width"),
+        "max_height": options.get("max_height"),
+    }
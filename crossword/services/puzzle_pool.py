@@ -0,0 +1,173 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import CategoryPopularity, PooledPuzzle
+from .clue_cache import normalize_category
+from .crossword_service import GeneratedPuzzle, crossword_service
+
+logger = logging.getLogger(__name__)
+
+
+class PuzzlePool:
+    """
+    Stock of fully built puzzles per (normalized category, size) so popular
+    requests can be served without waiting on the LLM.
+
+    Refills run on a small thread pool (PUZZLE_POOL_REFILL_WORKERS) and
+    at most one refill per (category, size) is in flight at a time.
+    """
+
+    def __init__(self, crossword_service):
+        self._crossword_service = crossword_service
+        self._executor = None
+        self._in_flight = set()
+        self._lock = threading.Lock()
+
+    def record_request(self, category, size):
+        category = normalize_category(category)
+        updated = CategoryPopularity.objects.filter(
+            category=category, size=size
+        ).update(request_count=F("request_count") + 1, last_requested_at=timezone.now())
+        if not updated:
+            CategoryPopularity.objects.get_or_create(
+                category=category, size=size, defaults={"request_count": 1}
+            )
+
+    async def aget_or_generate(self, category, size):
+        """
+        Serves a puzzle from stock when there is one, otherwise builds it now.
+        Either way popular categories are topped up in the background.
+        Only the stock bookkeeping runs on a thread, the LLM call is awaited
+        on the event loop. A degraded (fallback) puzzle means the LLM is down,
+        so no refill is started. Returns a GeneratedPuzzle
+        """
+        await sync_to_async(self.record_request)(category, size)
+        puzzle = await sync_to_async(self.pop)(category, size)
+        if puzzle is None:
+            puzzle = await self._crossword_service.agenerate(category, size=size)
+            if puzzle.degraded:
+                return puzzle
+            if not await sync_to_async(self.is_popular)(category, size):
+                return puzzle
+        self.schedule_refill(category, size)
+        return puzzle
+
+    def pop(self, category, size):
+        """
+        Removes and returns the oldest fresh puzzle in stock as a
+        GeneratedPuzzle, or None
+        """
+        with transaction.atomic():
+            puzzle = (
+                self._fresh(normalize_category(category), size)
+                .select_for_update(skip_locked=True)
+                .order_by("created_at")
+                .first()
+            )
+            if puzzle is None:
+                return None
+            puzzle.delete()
+        return GeneratedPuzzle.build(
+            puzzle.solution_grid, puzzle.across_clues, puzzle.down_clues
+        )
+
+    def stock(self, category, size):
+        return self._fresh(normalize_category(category), size).count()
+
+    def is_popular(self, category, size):
+        return CategoryPopularity.objects.filter(
+            category=normalize_category(category),
+            size=size,
+            request_count__gte=settings.PUZZLE_POOL_MIN_REQUESTS,
+        ).exists()
+
+    def popular(self, limit):
+        """
+        Most requested (category, size) pairs worth keeping in stock
+        """
+        return list(
+            CategoryPopularity.objects.filter(
+                request_count__gte=settings.PUZZLE_POOL_MIN_REQUESTS
+            )
+            .order_by("-request_count")
+            .values_list("category", "size")[:limit]
+        )
+
+    def refill(self, category, size, target=None):
+        """
+        Generates puzzles until target are in stock, returns how many were added.
+        Stops at the first degraded puzzle: fallback clues are not stocked.
+        """
+        category = normalize_category(category)
+        target = target or settings.PUZZLE_POOL_TARGET_STOCK
+        added = 0
+        while self._fresh(category, size).count() < target:
+            puzzle = self._crossword_service.generate(category, size=size)
+            if puzzle.degraded:
+                logger.warning(
+                    "Puzzle pool refill for %s got fallback clues, not stocking",
+                    (category, size),
+                )
+                break
+            grid, across_clues, down_clues = puzzle
+            PooledPuzzle.objects.create(
+                category=category,
+                size=size,
+                solution_grid=grid,
+                across_clues=across_clues,
+                down_clues=down_clues,
+            )
+            added += 1
+        return added
+
+    def schedule_refill(self, category, size):
+        """
+        Refills in the background unless a refill for the same key is running
+        """
+        key = (normalize_category(category), size)
+        with self._lock:
+            if key in self._in_flight:
+                return
+            self._in_flight.add(key)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.PUZZLE_POOL_REFILL_WORKERS,
+                    thread_name_prefix="puzzle-pool",
+                )
+        self._executor.submit(self._background_refill, key)
+
+    def drain_stale(self, max_age=None):
+        """
+        Deletes stock older than max_age (seconds), returns how many were removed
+        """
+        max_age = max_age or settings.PUZZLE_POOL_MAX_AGE
+        cutoff = timezone.now() - timedelta(seconds=max_age)
+        deleted, _ = PooledPuzzle.objects.filter(created_at__lt=cutoff).delete()
+        return deleted
+
+    def _fresh(self, category, size):
+        cutoff = timezone.now() - timedelta(seconds=settings.PUZZLE_POOL_MAX_AGE)
+        return PooledPuzzle.objects.filter(
+            category=category, size=size, created_at__gte=cutoff
+        )
+
+    def _background_refill(self, key):
+        try:
+            self.refill(*key)
+        except Exception:
+            logger.exception("Puzzle pool refill failed for %s", key)
+        finally:
+            with self._lock:
+                self._in_flight.discard(key)
+            close_old_connections()
+
+
+puzzle_pool = PuzzlePool(crossword_service)
@@ -0,0 +1,248 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+
+from django.core.cache import caches
+
+
+class SingleFlight:
+    """
+    Lets concurrent callers with the same key share one expensive call.
+
+    Within a process the first caller (the leader) runs the call and the
+    others wait on its Future. Across workers the leader also holds a lock
+    in the shared cache; leaders in other processes that find the lock
+    taken poll lookup() for the result the lock holder stores.
+
+    If the leader fails, is cancelled, is abandoned part way through a
+    stream or is slower than wait_timeout, followers fall back to making
+    the call themselves.
+    """
+
+    def __init__(self, cache_alias, lock_timeout, wait_timeout, poll_interval=0.2):
+        self.cache_alias = cache_alias
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, lookup):
+        """
+        Returns fn(), sharing one call between concurrent callers of key.
+        lookup() returns the stored result or None.
+        """
+        future, leader = self._join(key)
+        if not leader:
+            try:
+                return future.result(timeout=self.wait_timeout)
+            except Exception:
+                return fn()
+
+        try:
+            result = self._do_shared(key, fn, lookup)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result=result)
+        return result
+
+    async def ado(self, key, afn, alookup):
+        """
+        Async version of do for coroutine functions
+        """
+        future, leader = self._join(key)
+        if not leader:
+            try:
+                # shield so a follower timing out doesn't cancel the leader's future
+                return await asyncio.wait_for(
+                    asyncio.shield(asyncio.wrap_future(future)), self.wait_timeout
+                )
+            except Exception:
+                return await afn()
+
+        try:
+            result = await self._ado_shared(key, afn, alookup)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result=result)
+        return result
+
+    def do_stream(self, key, stream, lookup):
+        """
+        Streaming version of do, used as
+        `result, streamed = yield from single_flight.do_stream(...)`.
+        stream() is a generator: the caller making the call passes its items
+        through as they arrive and gets its return value. Callers sharing
+        another caller's call yield nothing and get its result, with
+        streamed False.
+        """
+        future, leader = self._join(key)
+        if not leader:
+            try:
+                return future.result(timeout=self.wait_timeout), False
+            except Exception:
+                return (yield from stream()), True
+
+        try:
+            result, streamed = yield from self._stream_shared(key, stream, lookup)
+        except BaseException as e:
+            # includes a caller abandoning the stream part way
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result=result)
+        return result, streamed
+
+    async def ado_stream(self, key, stream, alookup, replay):
+        """
+        Async version of do_stream. Async generators can't return a value,
+        so this is one itself: the caller making the call passes the items
+        of stream() through, and stream() stores its result where alookup()
+        finds it. Callers sharing another caller's call get the items of
+        replay(result) instead.
+        """
+        future, leader = self._join(key)
+        if not leader:
+            try:
+                result = await asyncio.wait_for(
+                    asyncio.shield(asyncio.wrap_future(future)), self.wait_timeout
+                )
+            except Exception:
+                async for item in stream():
+                    yield item
+            else:
+                for item in replay(result):
+                    yield item
+            return
+
+        try:
+            result = None
+            cache = caches[self.cache_alias]
+            lock_key = self._lock_key(key)
+            if await cache.aadd(lock_key, 1, self.lock_timeout):
+                try:
+                    async for item in stream():
+                        yield item
+                finally:
+                    await cache.adelete(lock_key)
+            else:
+                result = await self._await_for(lock_key, alookup)
+                if result is None:
+                    async for item in stream():
+                        yield item
+                else:
+                    for item in replay(result):
+                        yield item
+            if result is None:
+                result = await alookup()
+        except BaseException as e:
+            # includes a caller abandoning the stream part way
+            self._finish(key, future, error=e)
+            raise
+        if result is None:
+            self._finish(key, future, error=RuntimeError("stream stored no result"))
+        else:
+            self._finish(key, future, result=result)
+
+    def _do_shared(self, key, fn, lookup):
+        cache = caches[self.cache_alias]
+        lock_key = self._lock_key(key)
+        if cache.add(lock_key, 1, self.lock_timeout):
+            try:
+                return fn()
+            finally:
+                cache.delete(lock_key)
+
+        result = self._wait_for(lock_key, lookup)
+        return result if result is not None else fn()
+
+    def _stream_shared(self, key, stream, lookup):
+        cache = caches[self.cache_alias]
+        lock_key = self._lock_key(key)
+        if cache.add(lock_key, 1, self.lock_timeout):
+            try:
+                return (yield from stream()), True
+            finally:
+                cache.delete(lock_key)
+
+        result = self._wait_for(lock_key, lookup)
+        if result is not None:
+            return result, False
+        return (yield from stream()), True
+
+    def _wait_for(self, lock_key, lookup):
+        """
+        Waits for the worker holding lock_key to store its result and
+        returns it, or None if the caller should make the call itself
+        """
+        cache = caches[self.cache_alias]
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            result = lookup()
+            if result is not None:
+                return result
+            if cache.get(lock_key) is None:
+                # lock released: result just stored, or the other worker failed
+                return lookup()
+            time.sleep(self.poll_interval)
+        return None
+
+    async def _ado_shared(self, key, afn, alookup):
+        cache = caches[self.cache_alias]
+        lock_key = self._lock_key(key)
+        if await cache.aadd(lock_key, 1, self.lock_timeout):
+            try:
+                return await afn()
+            finally:
+                await cache.adelete(lock_key)
+
+        result = await self._await_for(lock_key, alookup)
+        return result if result is not None else await afn()
+
+    async def _await_for(self, lock_key, alookup):
+        """
+        Async version of _wait_for
+        """
+        cache = caches[self.cache_alias]
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            result = await alookup()
+            if result is not None:
+                return result
+            if await cache.aget(lock_key) is None:
+                return await alookup()
+            await asyncio.sleep(self.poll_interval)
+        return None
+
+    def _join(self, key):
+        """
+        Returns (future, is_leader) for key in this process
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            return future, True
+
+    def _finish(self, key, future, result=None, error=None):
+        with self._lock:
+            self._calls.pop(key, None)
+        if future.done():
+            return
+        if error is not None:
+            if not isinstance(error, Exception):
+                # CancelledError or GeneratorExit stop the leader, not its
+                # followers: hand them an error they fall back on
+                abandoned = RuntimeError("shared call abandoned by its leader")
+                abandoned.__cause__ = error
+                error = abandoned
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _lock_key(self, key):
+        return f"single-flight:{key}"
@@ -0,0 +1,78 @@
+"""
+Clean-up and ordering of the {word: clue} pairs between the clue provider
+and placement.
+
+Words are reduced to A-Z uppercase ("Rock 'n' roll" -> "ROCKNROLL",
+"Café" -> "CAFE") so equal letters always intersect, duplicates after
+normalizing keep their first clue, and words with digits, too short for
+a crossword or too long for the size's grid limits are dropped.
+
+The rest are ordered by intersection potential: how many letters of the
+other words each one could cross. Words that cross easily go down first
+and build a grid the harder ones can still find a way into.
+"""
+
+import unicodedata
+from collections import Counter
+
+from .placement import grid_limits
+
+MIN_WORD_LENGTH = 2
+
+
+def normalize_word(word):
+    """
+    "New York" / "new-york" / "Café" -> "NEWYORK" / "NEWYORK" / "CAFE".
+    Words with digits can't be spelled out reliably and give "".
+    """
+    if any(ch.isdigit() for ch in word):
+        return ""
+    decomposed = unicodedata.normalize("NFKD", word.upper())
+    return "".join(ch for ch in decomposed if "A" <= ch <= "Z")
+
+
+def max_word_length(size):
+    """
+    Longest word the size's grid can hold, None if unlimited
+    """
+    limits = grid_limits(size)
+    if limits["max_width"] is None or limits["max_height"] is None:
+        return None
+    return max(limits["max_width"], limits["max_height"])
+
+
+def is_usable(word, max_length=None):
+    """
+    Whether a normalized word can go on the grid
+    """
+    if len(word) < MIN_WORD_LENGTH:
+        return False
+    return max_length is None or len(word) <= max_length
+
+
+def intersection_scores(words):
+    """
+    {word: letters of the other words matching one of its letters}
+    """
+    counts = Counter()
+    for word in words:
+        counts.update(word)
+    return {word: sum(counts[ch] - word.count(ch) for ch in word) for word in words}
+
+
+def prepare_clues(clues, size):
+    """
+    Normalized, deduplicated and usable {WORD: clue} pairs from clues,
+    ordered by intersection potential
+    """
+    max_length = max_word_length(size)
+    prepared = {}
+    for word, clue in clues.items():
+        word = normalize_word(word)
+        if word not in prepared and is_usable(word, max_length):
+            prepared[word] = clue
+
+    scores = intersection_scores(prepared)
+    # stable, so ties keep the provider's order
+    ordered = sorted(prepared, key=scores.get, reverse=True)
+    return {word: prepared[word] for word in ordered}
@@ -15,31 +15,82 @@ function initCrosswordPage() {
         loadingText.style.display = 'block';
         container.innerHTML = '';
 
-        fetch(form.action, {
-            method: 'POST',
-            body: formData,
-            headers: { 'X-Requested-With': 'XMLHttpRequest' }
-        })
-        .then(response => response.text())
-        .then(html => {
+        function showCrossword(html) {
             container.innerHTML = html;
             spinner.style.display = 'none';
             loadingText.style.display = 'none';
             crosswordCompleted = false; // reset for new puzzles
-            
-            restoreProgressGridIfPresent();
-            initAutoCheck();
-            initClueHoverHighlight();
-            initCellHoverClueHighlight();
+
+            initCrossword().catch(err => console.error(err));
+        }
+
+        // same markup as the partial's error state
+        function showError(message) {
+            spinner.style.display = 'none';
+            loadingText.style.display = 'none';
+
+            const wrapper = document.createElement('div');
+            wrapper.className = 'crossword-container';
+            const alert = document.createElement('div');
+            alert.className = 'alert';
+            alert.textContent = 'Failed to Generate Crossword';
+            const detail = document.createElement('div');
+            detail.className = 'dev-error-message';
+            detail.textContent = message;
+            alert.appendChild(detail);
+            wrapper.appendChild(alert);
+            container.replaceChildren(wrapper);
+        }
+
+        function readJson(response) {
+            if (!response.ok) {
+                // rejected requests say why in {"error": ...}
+                return response.json()
+                    .catch(() => ({}))
+                    .then(body => {
+                        throw new Error(body.error || `Request failed (${response.status})`);
+                    });
+            }
+            return response.json();
+        }
+
+        // the POST only queues a generation job, poll it until the partial is
+        // ready or give up once the deadline has passed
+        function pollJob(statusUrl, deadline) {
+            if (Date.now() > deadline) {
+                throw new Error('Generation is taking too long, please try again');
+            }
+            return fetch(statusUrl, {
+                headers: { 'X-Requested-With': 'XMLHttpRequest' }
+            })
+            .then(readJson)
+            .then(job => {
+                if (job.html !== undefined) {
+                    showCrossword(job.html);
+                    return;
+                }
+                return new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS))
+                    .then(() => pollJob(statusUrl, deadline));
+            });
+        }
+
+        fetch(form.action, {
+            method: 'POST',
+            body: formData,
+            headers: { 'X-Requested-With': 'XMLHttpRequest' }
         })
+        .then(readJson)
+        .then(job => pollJob(job.status_url, Date.now() + JOB_POLL_TIMEOUT_MS))
         .catch(err => {
             console.error(err);
-            spinner.style.display = 'none';
-            loadingText.style.display = 'none';
+            showError(err.message);
         });
     });
 }
 
+const JOB_POLL_INTERVAL_MS = 1000;
+// stop polling a job after this long (the server fails it after GENERATION_JOB_TIMEOUT)
+const JOB_POLL_TIMEOUT_MS = 3 * 60 * 1000;
 let crosswordCompleted = false;
 
 function showConfetti() {
@@ -310,10 +361,12 @@ function initAutoCheck() {
     // ----- INPUT HANDLERS -----
     inputs.forEach(input => {
         input.addEventListener("input", () => {
-            let val = (input.value || "").toUpperCase();
+            const typed = input.value || "";
+            // only A-Z can be saved (the server rejects anything else)
+            let val = typed.toUpperCase().replace(/[^A-Z]/g, "");
 
-            // prevent spaces as cell input
-            if (val === " ") {
+            // ignore spaces, digits, accented letters...
+            if (typed !== "" && val === "") {
                 input.value = "";
                 return;
             }
@@ -344,6 +397,7 @@ function initAutoCheck() {
                 if (next) next.focus();
             }
             checkCrosswordComplete();
+            scheduleAutosave();
         });
 
         input.addEventListener("keydown", (e) => {
@@ -354,6 +408,7 @@ function initAutoCheck() {
                     prev.focus();
                     prev.value = "";
                     if (autoCheck) styleInput(prev);
+                    scheduleAutosave();
                 }
             }
         });
@@ -378,42 +433,176 @@ function getCookie(name) {
     return cookieValue;
 }
 
-// Build a 2D array from the current DOM grid
-function buildProgressGrid() {
-    const rows = Array.from(
-        document.querySelectorAll(".crossword-table tr")
+// Compact grid helpers (see crossword/utils.py):
+// the solution's letters and the progress are row-major strings of rows * cols,
+// with "-" for black squares and " " for empty white squares
+
+// Decode a compact solution into rows of {letter, across_number, down_number, label}
+function decodeGrid(solution) {
+    const grid = [];
+    for (let r = 0; r < solution.rows; r++) {
+        const row = [];
+        for (let c = 0; c < solution.cols; c++) {
+            const index = r * solution.cols + c;
+            const numbers = solution.numbers[index] || [0, 0];
+            row.push({
+                letter: solution.letters[index],
+                across_number: numbers[0] || null,
+                down_number: numbers[1] || null,
+                label: solution.labels[index] || null,
+            });
+        }
+        grid.push(row);
+    }
+    return grid;
+}
+
+// Decode a progress string into rows of "-" / "" / letter
+function decodeProgress(progress, cols) {
+    const rows = [];
+    for (let i = 0; i < progress.length; i += cols) {
+        rows.push(
+            Array.from(progress.slice(i, i + cols)).map(ch => (ch === " " ? "" : ch))
+        );
+    }
+    return rows;
+}
+
+// Encode the current DOM grid as a progress string
+function buildProgress() {
+    const cells = Array.from(
+        document.querySelectorAll(".crossword-table td")
     );
 
-    return rows.map((row) => {
-        const cells = Array.from(row.querySelectorAll("td"));
-        return cells.map((td) => {
-            const input = td.querySelector("input.crossword-input");
+    return cells.map((td) => {
+        const input = td.querySelector("input.crossword-input");
+
+        if (!input) {
+            // black square
+            return "-";
+        }
+
+        const val = input.value.toUpperCase();
+        return val ? val[0] : " ";
+    }).join("");
+}
+
+// ----- RENDERING -----
+// The page carries the puzzle payload once ({solution, across_clues, down_clues}):
+// embedded for new puzzles, or as a URL for saved ones, which the browser
+// caches and revalidates with the puzzle's ETag
+let currentPuzzle = null;
+
+async function loadPuzzle() {
+    const embedded = document.getElementById("puzzle-data");
+    if (embedded) {
+        return JSON.parse(embedded.textContent);
+    }
 
-            if (!input) {
-                // black square
-                return "-";
+    const source = document.getElementById("puzzle-source");
+    if (!source) return null;
+
+    const response = await fetch(source.dataset.puzzleUrl, {
+        headers: { "X-Requested-With": "XMLHttpRequest" }
+    });
+    if (!response.ok) {
+        throw new Error("Could not load puzzle: " + response.status);
+    }
+    return response.json();
+}
+
+function renderGrid(solution) {
+    const table = document.querySelector(".crossword-table");
+    if (!table) return;
+
+    const rows = document.createDocumentFragment();
+    decodeGrid(solution).forEach(row => {
+        const tr = document.createElement("tr");
+        row.forEach(cell => {
+            const td = document.createElement("td");
+            if (cell.letter === "-") {
+                td.className = "black-square";
+                tr.appendChild(td);
+                return;
             }
 
-            const val = input.value.toUpperCase();
-            return val || "";
+            const acrossNumber = cell.across_number ? String(cell.across_number) : "";
+            const downNumber = cell.down_number ? String(cell.down_number) : "";
+            td.className = "white-square";
+            td.dataset.acrossNumber = acrossNumber;
+            td.dataset.downNumber = downNumber;
+
+            const div = document.createElement("div");
+            div.className = "cell";
+            if (cell.label) {
+                const span = document.createElement("span");
+                span.className = "corner-number";
+                span.textContent = cell.label;
+                div.appendChild(span);
+            }
+
+            const input = document.createElement("input");
+            input.type = "text";
+            input.maxLength = 1;
+            input.className = "crossword-input";
+            input.dataset.answer = cell.letter.toUpperCase();
+            input.dataset.acrossNumber = acrossNumber;
+            input.dataset.downNumber = downNumber;
+            div.appendChild(input);
+
+            td.appendChild(div);
+            tr.appendChild(td);
         });
+        rows.appendChild(tr);
+    });
+    table.replaceChildren(rows);
+}
+
+function renderClues(listId, clues, direction) {
+    const list = document.getElementById(listId);
+    if (!list) return;
+
+    const items = document.createDocumentFragment();
+    (clues || []).forEach(clue => {
+        const li = document.createElement("li");
+        li.className = "clue-item";
+        li.dataset.direction = direction;
+        li.dataset.clueNumber = clue.number;
+
+        const number = document.createElement("strong");
+        number.textContent = clue.number + ".";
+        li.append(number, " " + clue.clue);
+        items.appendChild(li);
     });
+    list.replaceChildren(items);
 }
 
-function getCrosswordDataFromDom() {
-    const solutionEl = document.getElementById("solution-grid-data");
-    const acrossEl = document.getElementById("across-clues-data");
-    const downEl = document.getElementById("down-clues-data");
+async function initCrossword() {
+    currentPuzzle = await loadPuzzle();
+    if (currentPuzzle && currentPuzzle.solution) {
+        renderClues("across-clue-list", currentPuzzle.across_clues, "across");
+        renderClues("down-clue-list", currentPuzzle.down_clues, "down");
+        renderGrid(currentPuzzle.solution);
+        restoreProgressGridIfPresent();
+    }
+
+    initSavedCrossword();
+    initAutoCheck();
+    initClueHoverHighlight();
+    initCellHoverClueHighlight();
+}
+
+function getCrosswordData() {
     const categoryEl = document.getElementById("category-data");
 
-    if (!solutionEl || !acrossEl || !downEl || !categoryEl) {
+    if (!currentPuzzle || !currentPuzzle.solution || !categoryEl) {
         return null;
     }
 
     return {
-        solutionGrid: JSON.parse(solutionEl.textContent),
-        acrossClues: JSON.parse(acrossEl.textContent),
-        downClues: JSON.parse(downEl.textContent),
+        solution: currentPuzzle.solution,
+        acrossClues: currentPuzzle.across_clues,
+        downClues: currentPuzzle.down_clues,
         category: JSON.parse(categoryEl.textContent),
     };
 }
@@ -424,7 +613,7 @@ document.addEventListener("click", async (event) => {
     const target = event.target;
     // Reveal grid button
     if (target && target.id === "reveal-solution-btn") {
-        if (!getCrosswordDataFromDom()) {
+        if (!getCrosswordData()) {
             alert("Start a crossword to reveal solution")
             return;
         }
@@ -446,13 +635,29 @@ document.addEventListener("click", async (event) => {
 
     // save crossword button
     if (target && target.id === "save-crossword-btn") {
-        const data = getCrosswordDataFromDom();
+        const data = getCrosswordData();
         if (!data) {
             alert("Start a crossword to save your progress");
             return;
         }
 
-        const progressGrid = buildProgressGrid();
+        // already saved: only send the cells that changed
+        if (savedCrossword) {
+            clearTimeout(autosaveTimer);
+            try {
+                if (await flushProgress()) {
+                    alert("Crossword Successfully Saved!");
+                } else {
+                    alert("Failed to save crossword progress");
+                }
+            } catch (err) {
+                console.error(err);
+                alert("Network error while saving crossword.");
+            }
+            return;
+        }
+
+        const progress = buildProgress();
         const csrftoken = getCookie("csrftoken");
         const saveUrl = target.dataset.saveUrl;
 
@@ -466,8 +671,8 @@ document.addEventListener("click", async (event) => {
                 },
                 body: JSON.stringify({
                     category: data.category,
-                    solution_grid: data.solutionGrid,
-                    progress_grid: progressGrid,
+                    solution: data.solution,
+                    progress: progress,
                     across_clues: data.acrossClues,
                     down_clues: data.downClues,
                 }),
@@ -476,6 +681,12 @@ document.addEventListener("click", async (event) => {
             const json = await response.json();
 
             if (json.success) {
+                savedCrossword = {
+                    id: json.id,
+                    version: json.version,
+                    progress_url: json.progress_url,
+                };
+                lastSavedProgress = progress;
                 alert("Crossword Successfully Saved!");
             } else {
                 alert("Failed to save crossword: " + (json.error || "Unknown error"));
@@ -487,21 +698,96 @@ document.addEventListener("click", async (event) => {
     }
 });
 
+// ----- AUTOSAVE -----
+// Once a crossword has been saved, progress is sent as small batches of
+// changed cells (debounced) with the version last seen from the server
+const AUTOSAVE_DELAY_MS = 1500;
+const AUTOSAVE_MAX_CONFLICT_RETRIES = 3;
+let savedCrossword = null; // {id, version, progress_url}
+let lastSavedProgress = "";
+let autosaveTimer = null;
+let autosaveInFlight = null;
+
+function initSavedCrossword() {
+    clearTimeout(autosaveTimer);
+    const el = document.getElementById("saved-crossword-data");
+    savedCrossword = el ? JSON.parse(el.textContent) : null;
+    lastSavedProgress = savedCrossword ? buildProgress() : "";
+}
+
+function scheduleAutosave() {
+    if (!savedCrossword) return;
+    clearTimeout(autosaveTimer);
+    autosaveTimer = setTimeout(() => {
+        flushProgress().catch(err => console.error(err));
+    }, AUTOSAVE_DELAY_MS);
+}
+
+// Send the cells changed since the last save, resolves to true on success
+async function flushProgress() {
+    // one request at a time so versions stay in order
+    while (autosaveInFlight) {
+        await autosaveInFlight;
+    }
+    autosaveInFlight = sendProgressDelta(AUTOSAVE_MAX_CONFLICT_RETRIES);
+    try {
+        return await autosaveInFlight;
+    } finally {
+        autosaveInFlight = null;
+    }
+}
+
+async function sendProgressDelta(retries) {
+    const progress = buildProgress();
+    const cells = {};
+    for (let i = 0; i < progress.length; i++) {
+        if (progress[i] !== lastSavedProgress[i]) {
+            cells[i] = progress[i] === " " ? "" : progress[i];
+        }
+    }
+    if (Object.keys(cells).length === 0) return true;
+
+    const response = await fetch(savedCrossword.progress_url, {
+        method: "PATCH",
+        headers: {
+            "Content-Type": "application/json",
+            "X-CSRFToken": getCookie("csrftoken"),
+            "X-Requested-With": "XMLHttpRequest",
+        },
+        body: JSON.stringify({ version: savedCrossword.version, cells: cells }),
+    });
+    const json = await response.json();
+
+    if (response.status === 409 && retries > 0) {
+        // saved from somewhere else in between, re-apply our changes on top
+        savedCrossword.version = json.version;
+        lastSavedProgress = json.progress;
+        return sendProgressDelta(retries - 1);
+    }
+    if (!json.success) return false;
+
+    savedCrossword.version = json.version;
+    lastSavedProgress = progress;
+    return true;
+}
+
 function restoreProgressGridIfPresent() {
-    const progressEl = document.getElementById("progress-grid-data");
-    if (!progressEl) return;
+    const progressEl = document.getElementById("progress-data");
+    const data = getCrosswordData();
+    if (!progressEl || !data || !data.solution) return;
 
-    let progressGrid;
+    let progress;
     try {
-        progressGrid = JSON.parse(progressEl.textContent);
+        progress = JSON.parse(progressEl.textContent);
     } catch (e) {
-        console.warn("Could not parse progress grid", e);
+        console.warn("Could not parse progress", e);
         return;
     }
-    if (!Array.isArray(progressGrid) || progressGrid.length === 0) {
+    if (typeof progress !== "string" || progress.length === 0) {
         return;
     }
 
+    const progressGrid = decodeProgress(progress, data.solution.cols);
     const rows = Array.from(document.querySelectorAll(".crossword-table tr"));
 
     rows.forEach((rowEl, r) => {
@@ -510,13 +796,9 @@ function restoreProgressGridIfPresent() {
             const input = td.querySelector("input.crossword-input");
             if (!input) return;
 
-            if (
-                r < progressGrid.length &&
-                Array.isArray(progressGrid[r]) &&
-                c < progressGrid[r].length
-            ) {
+            if (r < progressGrid.length && c < progressGrid[r].length) {
                 const val = progressGrid[r][c];
-                if (val && typeof val === "string") {
+                if (val && val !== "-") {
                     input.value = val.toUpperCase();
                 }
             }
@@ -526,8 +808,5 @@ function restoreProgressGridIfPresent() {
 
 document.addEventListener("DOMContentLoaded", () => {
     initCrosswordPage();
-    restoreProgressGridIfPresent();
-    initAutoCheck();
-    initClueHoverHighlight();
-    initCellHoverClueHighlight();
+    initCrossword().catch(err => console.error(err));
 });
@@ -1,3 +1,1417 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+    tag,
+)
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import (
+    CategoryPopularity,
+    GenerationJob,
+    PooledPuzzle,
+    Puzzle,
+    SavedCrossword,
+)
+from .services import batch, benchmark, layout_pool, metrics
+from .services.clue_cache import CachedClueGenerator, normalize_category
+from .services.clue_providers import FallbackProvider, WordListProvider
+from .services.crossword_service import CrosswordService, GeneratedPuzzle
+from .services.generation_jobs import GenerationJobRunner
+from .services.llm_service import ClueStreamParser, CrosswordClueGenerator
+from .services.llm_transport import LLMTransport, SharedSemaphore
+from .services.single_flight import SingleFlight
+from .services.grid import CrosswordGrid
+from .services.placement import (
+    BeamSearchPlacer,
+    GreedyPlacer,
+    candidates,
+    get_placer,
+    grid_limits,
+    start_grid,
+)
+from .services.puzzle_pool import PuzzlePool
+from .services.word_list import (
+    intersection_scores,
+    is_usable,
+    max_word_length,
+    normalize_word,
+    prepare_clues,
+)
+from .utils import (
+    decode_grid,
+    decode_progress,
+    empty_progress,
+    encode_grid,
+    encode_progress,
+)
+
+
+@tag("perf")
+class PlacementPerformanceTests(SimpleTestCase):
+    """
+    Fails when placement gets slower, uses more memory, or places fewer
+    words / builds sparser grids than the stored baselines
+    (crossword/tests/perf_baselines.json, refresh with
+    `manage.py benchmark_placement --save-baseline`).
+
+    Wall time depends on the machine; CROSSWORD_PERF_TIME_TOLERANCE
+    (default 1.0, i.e. +100%) loosens it on slow CI runners. Tagged "perf":
+    `manage.py test --exclude-tag perf` skips them, `--tag perf` runs only them.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.baselines = benchmark.load_baselines()
+        cls.tolerances = {
+            "total_ms": float(os.getenv("CROSSWORD_PERF_TIME_TOLERANCE", "1.0"))
+        }
+
+    def test_baselines_cover_every_workload(self):
+        self.assertEqual(
+            set(self.baselines.get("workloads", {})), set(benchmark.WORKLOADS)
+        )
+
+    @benchmark.quiet_stage_logs()
+    def test_layouts_are_reproducible(self):
+        clues, size = benchmark.load_workload("large_sample")
+        first = benchmark.build(clues, size, seed=7)[:2]
+        second = benchmark.build(clues, size, seed=7)[:2]
+        self.assertEqual(first, second)
+
+    def test_no_regressions(self):
+        seed = self.baselines.get("seed", benchmark.DEFAULT_SEED)
+        for name in benchmark.WORKLOADS:
+            with self.subTest(workload=name):
+                result = benchmark.run_workload(name, seed, repeats=3)
+                regressions = benchmark.compare(
+                    name, result, self.baselines, self.tolerances
+                )
+                self.assertEqual(regressions, [])
+
+
+class BeamSearchPlacerTests(SimpleTestCase):
+    # XYZ shares no letter with ABCDE, it only fits once EXQ brings an X
+    WORDS = ["ABCDE", "XYZ", "EXQ"]
+
+    def test_skipped_words_are_retried_on_the_final_grid(self):
+        placer = BeamSearchPlacer(rng=random.Random(1))
+        _, words_placed = placer.place(self.WORDS)
+        self.assertEqual(set(words_placed), set(self.WORDS))
+
+    def test_retries_can_be_turned_off(self):
+        placer = BeamSearchPlacer(rng=random.Random(1), retry_passes=0)
+        _, words_placed = placer.place(self.WORDS)
+        self.assertNotIn("XYZ", words_placed)
+
+
+class GridOutputTests(SimpleTestCase):
+    """
+    The working grid only becomes rows of cell dicts at the output boundary
+    """
+
+    @benchmark.quiet_stage_logs()
+    def test_built_puzzle_shape(self):
+        service = CrosswordService(None, BeamSearchPlacer(rng=random.Random(1)))
+        grid, across, down = service.build_puzzle(
+            {"cat": "pet", "cow": "farm animal"}, "small"
+        )
+
+        def cell(letter, across=None, down=None):
+            return {"letter": letter, "across_number": across, "down_number": down}
+
+        self.assertEqual(
+            grid,
+            [
+                [{**cell("C", 1, 2), "label": "1/2"}, cell("A", 1), cell("T", 1)],
+                [cell("O", down=2), cell("-"), cell("-")],
+                [cell("W", down=2), cell("-"), cell("-")],
+            ],
+        )
+        self.assertEqual(across, [{"word": "CAT", "number": 1, "clue": "pet"}])
+        self.assertEqual(down, [{"word": "COW", "number": 2, "clue": "farm animal"}])
+
+    def test_empty_grid_has_no_rows(self):
+        self.assertEqual(CrosswordGrid().to_rows(), [])
+
+
+class GridBoundsTests(SimpleTestCase):
+    """
+    Bounding box and corner labels kept up to date as words are placed
+    """
+
+    def test_bbox_grows_in_every_direction(self):
+        grid, _ = start_grid("CAT")
+        self.assertEqual(grid.bbox, (0, 0, 0, 2))
+        # BOA ends on the A of CAT, so it starts two rows above the grid
+        grid.place("BOA", 0, 1, "v", 2, 2)
+        self.assertEqual(grid.bbox, (-2, 0, 0, 2))
+        grid.place("TO", 0, 2, "v", 0, 3)
+        self.assertEqual(grid.bbox, (-2, 0, 1, 2))
+
+        rows = grid.to_rows()
+        self.assertEqual(
+            ["".join(cell["letter"] for cell in row) for row in rows],
+            ["-B-", "-O-", "CAT", "--O"],
+        )
+        self.assertEqual(rows[0][1]["label"], "2")
+
+    def test_cell_starting_two_words_gets_both_numbers(self):
+        grid, _ = start_grid("CAT")
+        grid.place("COW", 0, 0, "v", 0, 2)
+        self.assertEqual(grid.labels, {(0, 0): "1/2"})
+        self.assertEqual(grid.to_rows()[0][0]["label"], "1/2")
+        self.assertNotIn("label", grid.to_rows()[0][1])
+
+
+class GridLimitTests(SimpleTestCase):
+    """
+    The grid grows on demand, up to the size tier's max width and height
+    """
+
+    def test_limits_reject_words_that_would_outgrow_the_grid(self):
+        grid, _ = start_grid("ABCDE", max_width=5, max_height=3)
+        self.assertTrue(grid.can_place("AXE", 0, 0, "v", 0))
+        self.assertFalse(grid.can_place("AXES", 0, 0, "v", 0))
+        grid.place("AXE", 0, 0, "v", 0, 2)
+        self.assertTrue(grid.can_place("EW", 2, 0, "h", 0))
+        self.assertFalse(grid.can_place("WE", 2, 0, "h", 1))
+
+    def test_unlimited_grid_keeps_growing(self):
+        grid, _ = start_grid("ABCDE")
+        self.assertTrue(grid.can_place("XXXXXXXXXXXXXXXXXXXXA", 0, 0, "v", 20))
+
+    @override_settings(
+        CROSSWORD_PLACEMENT_BUDGETS={
+            "small": {"engine": "greedy", "max_width": 9, "max_height": 7},
+            "default": {"engine": "beam", "beam_width": 3, "max_width": None},
+        }
+    )
+    def test_placer_follows_the_size_tier(self):
+        placer = get_placer("small", random.Random(1))
+        self.assertIsInstance(placer, GreedyPlacer)
+        self.assertEqual(grid_limits("small"), {"max_width": 9, "max_height": 7})
+
+        clues, _ = benchmark.load_workload("large_sample")
+        grid, words_placed = placer.place(prepare_clues(clues, "small"))
+        min_r, min_c, max_r, max_c = grid.bbox
+        self.assertLessEqual(max_c - min_c + 1, 9)
+        self.assertLessEqual(max_r - min_r + 1, 7)
+        self.assertGreater(len(words_placed), 1)
+
+        # unknown sizes get the default tier
+        placer = get_placer("huge")
+        self.assertIsInstance(placer, BeamSearchPlacer)
+        self.assertEqual(placer.beam_width, 3)
+        self.assertIsNone(placer.max_width)
+
+
+@override_settings(CROSSWORD_LAYOUT_WORKERS=2)
+class LayoutPoolTests(SimpleTestCase):
+    """
+    Several seeds laid out in the shared worker pool, best grid kept
+    """
+
+    def setUp(self):
+        clues, _ = benchmark.load_workload("large_sample")
+        # few enough words to finish well inside the time budget, so each
+        # seed lays out the same way in a worker and in this process
+        self.words = list(prepare_clues(clues, "small"))[:20]
+        self.addCleanup(layout_pool._reset_pool)
+
+    def test_workers_are_not_forked_from_the_web_process(self):
+        self.assertIn(layout_pool._START_METHOD, ("forkserver", "spawn"))
+        pool = layout_pool.get_pool()
+        self.assertIs(layout_pool.get_pool(), pool)
+        self.assertEqual(pool._mp_context.get_start_method(), layout_pool._START_METHOD)
+
+    def test_best_layout_matches_the_best_single_seed(self):
+        seeds = [1, 2, 3]
+        grid, words_placed = layout_pool.best_layout(self.words, "small", seeds)
+        expected = max(
+            (layout_pool._layout(self.words, "small", seed) for seed in seeds),
+            key=layout_pool.layout_rank,
+        )
+        self.assertEqual(words_placed, expected[1])
+        self.assertEqual(grid.letters, expected[0].letters)
+
+    def test_missed_deadline_uses_the_first_layout_done(self):
+        grid, words_placed = layout_pool.best_layout(
+            self.words, "small", [1, 2], deadline=0
+        )
+        self.assertIn(
+            words_placed,
+            [layout_pool._layout(self.words, "small", seed)[1] for seed in (1, 2)],
+        )
+
+
+class LetterIndexTests(SimpleTestCase):
+    """
+    grid.positions finds every cell holding a letter, not one per row
+    """
+
+    def test_positions_track_every_placed_letter(self):
+        grid, _ = start_grid("BANANA")
+        self.assertEqual(grid.positions["A"], {(0, 1), (0, 3), (0, 5)})
+        grid.place("NOD", 0, 2, "v", 0, 2)
+        self.assertEqual(grid.positions["N"], {(0, 2), (0, 4)})
+        self.assertEqual(grid.positions["D"], {(2, 2)})
+
+    def test_candidates_cross_every_occurrence_in_a_row(self):
+        grid, _ = start_grid("BANANA")
+        moves = set(candidates(grid, "AT"))
+        self.assertEqual(moves, {(0, 1, "v", 0), (0, 3, "v", 0), (0, 5, "v", 0)})
+
+    def test_copies_have_their_own_index(self):
+        grid, _ = start_grid("BANANA")
+        child = grid.copy()
+        child.place("AT", 0, 1, "v", 0, 2)
+        self.assertNotIn("T", grid.positions)
+        self.assertEqual(child.positions["T"], {(1, 1)})
+
+
+class GridEncodingTests(SimpleTestCase):
+    """
+    Compact storage of solution grids and progress (crossword/utils.py)
+    """
+
+    def grid(self):
+        grid, _ = start_grid("CAT")
+        grid.place("COW", 0, 0, "v", 0, 2)
+        grid.place("TO", 0, 2, "v", 0, 3)
+        return grid.to_rows()
+
+    def test_grid_round_trip(self):
+        rows = self.grid()
+        solution = encode_grid(rows)
+        self.assertEqual(
+            solution,
+            {
+                "rows": 3,
+                "cols": 3,
+                "letters": "CATO-OW--",
+                "numbers": {
+                    "0": [1, 2],
+                    "1": [1, 0],
+                    "2": [1, 3],
+                    "3": [0, 2],
+                    "5": [0, 3],
+                    "6": [0, 2],
+                },
+                "labels": {"0": "1/2", "2": "3"},
+            },
+        )
+        self.assertEqual(decode_grid(solution), rows)
+        self.assertEqual(decode_grid(json.loads(json.dumps(solution))), rows)
+
+    def test_progress_round_trip(self):
+        progress_rows = [["C", "", "T"], ["", "-", ""], ["W", "-", "-"]]
+        progress = encode_progress(progress_rows)
+        self.assertEqual(progress, "C T - W--")
+        self.assertEqual(decode_progress(progress, 3), progress_rows)
+        self.assertEqual(empty_progress("CATO-OW--"), "    -  --")
+
+
+class SaveProgressTests(TestCase):
+    """
+    PATCH saved/<pk>/progress/: versioned deltas against the progress string
+    """
+
+    # 2x3 grid, the middle of the top row is black
+    SOLUTION = {
+        "rows": 2,
+        "cols": 3,
+        "letters": "C-TDOG",
+        "numbers": {},
+        "labels": {},
+    }
+
+    def setUp(self):
+        self.user = User.objects.create_user("solver", password="pw-12345!")
+        self.client.force_login(self.user)
+        puzzle = Puzzle.for_content(self.SOLUTION, [], [])
+        self.saved = SavedCrossword.objects.create(
+            user=self.user,
+            puzzle=puzzle,
+            category="animals",
+            progress=empty_progress(puzzle.letters),
+        )
+        self.url = reverse("crossword:save_progress", args=[self.saved.pk])
+
+    def patch(self, body):
+        if not isinstance(body, str):
+            body = json.dumps(body)
+        return self.client.patch(self.url, body, content_type="application/json")
+
+    def test_applies_cells_and_bumps_version(self):
+        response = self.patch({"version": 0, "cells": {"0": "c", "5": "G"}})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"success": True, "version": 1})
+
+        response = self.patch({"version": 1, "cells": {"0": ""}})
+        self.assertEqual(response.status_code, 200)
+        self.saved.refresh_from_db()
+        self.assertEqual(self.saved.progress, " -   G")
+        self.assertEqual(self.saved.version, 2)
+
+    def test_stale_version_conflicts(self):
+        self.patch({"version": 0, "cells": {"0": "C"}})
+        response = self.patch({"version": 0, "cells": {"2": "T"}})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["version"], 1)
+        self.assertEqual(response.json()["progress"], "C-    ")
+
+    def test_black_and_unknown_cells_are_skipped(self):
+        response = self.patch(
+            {"version": 0, "cells": {"1": "A", "99": "B", "x": "C", "\u00b2": "D"}}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.saved.refresh_from_db()
+        self.assertEqual(self.saved.progress, " -    ")
+
+    def test_bad_input_is_rejected(self):
+        for body in (
+            "not json",
+            {"cells": {"0": "A"}},
+            {"version": 0},
+            {"version": 0, "cells": [1]},
+            {"version": 0, "cells": {"0": 5}},
+            {"version": 0, "cells": {"0": "-"}},
+            {"version": 0, "cells": {"0": "AB"}},
+            {"version": 0, "cells": {"0": "\u00e9"}},
+        ):
+            with self.subTest(body=body):
+                self.assertEqual(self.patch(body).status_code, 400)
+        self.saved.refresh_from_db()
+        self.assertEqual(self.saved.version, 0)
+
+    def test_other_users_puzzles_are_not_found(self):
+        other = User.objects.create_user("other", password="pw-12345!")
+        self.client.force_login(other)
+        response = self.patch({"version": 0, "cells": {"0": "C"}})
+        self.assertEqual(response.status_code, 404)
+
+    def save(self, progress):
+        return self.client.post(
+            reverse("crossword:save_crossword"),
+            json.dumps(
+                {"category": "animals", "solution": self.SOLUTION, "progress": progress}
+            ),
+            content_type="application/json",
+        )
+
+    def test_saved_progress_is_aligned_with_the_solution(self):
+        response = self.save("cAxd  ")
+        self.assertEqual(response.status_code, 200)
+        saved = SavedCrossword.objects.get(pk=response.json()["id"])
+        self.assertEqual(saved.progress, "C-XD  ")
+
+    def test_saved_progress_with_bad_cells_is_rejected(self):
+        for progress in ("C-T5OG", "C-TD-G", "C-\u00e9DOG", list("C-TDOG")):
+            with self.subTest(progress=progress):
+                self.assertEqual(self.save(progress).status_code, 400)
+
+
+class SaveAndDeleteTests(TestCase):
+    """
+    Saved crosswords share Puzzle rows, the last delete drops the puzzle
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user("solver", password="pw-12345!")
+        self.client.force_login(self.user)
+
+    def save(self):
+        response = self.client.post(
+            reverse("crossword:save_crossword"),
+            json.dumps({"category": "animals", "solution": SaveProgressTests.SOLUTION}),
+            content_type="application/json",
+        )
+        return SavedCrossword.objects.get(pk=response.json()["id"])
+
+    def delete(self, saved):
+        return self.client.post(
+            reverse("crossword:delete_saved_crossword", args=[saved.pk])
+        )
+
+    def test_puzzle_is_dropped_with_its_last_save(self):
+        first, second = self.save(), self.save()
+        self.assertEqual(first.puzzle_id, second.puzzle_id)
+        self.delete(first)
+        self.assertTrue(Puzzle.objects.filter(pk=second.puzzle_id).exists())
+        self.delete(second)
+        self.assertFalse(Puzzle.objects.exists())
+
+        # saving the same content again recreates it
+        self.assertEqual(self.save().puzzle.letters, "C-TDOG")
+
+
+class SavedCrosswordListTests(TestCase):
+    """
+    saved/: keyset pages of the user's crosswords, grids left in the DB
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user("solver", password="pw-12345!")
+        self.client.force_login(self.user)
+        puzzle = Puzzle.for_content(SaveProgressTests.SOLUTION, [], [])
+        other = User.objects.create_user("other", password="pw-12345!")
+        for user, count in ((self.user, 27), (other, 1)):
+            SavedCrossword.objects.bulk_create(
+                SavedCrossword(
+                    user=user, puzzle=puzzle, category=f"c{i}", progress="      "
+                )
+                for i in range(count)
+            )
+        # equal timestamps, so pages are split on the id tie-breaker
+        SavedCrossword.objects.update(updated_at=timezone.now())
+
+    def page(self, after=None):
+        data = {"after": after} if after else {}
+        return self.client.get(reverse("crossword:saved_crosswords"), data)
+
+    def test_pages_cover_every_crossword_once(self):
+        first = self.page()
+        self.assertEqual(len(first.context["crosswords"]), 25)
+        self.assertTrue(first.context["is_first_page"])
+        self.assertIn("progress", first.context["crosswords"][0].get_deferred_fields())
+
+        second = self.page(first.context["next_cursor"])
+        self.assertEqual(len(second.context["crosswords"]), 2)
+        self.assertIsNone(second.context["next_cursor"])
+
+        ids = [
+            saved.id
+            for response in (first, second)
+            for saved in response.context["crosswords"]
+        ]
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(
+            set(ids), set(self.user.saved_crosswords.values_list("id", flat=True))
+        )
+
+    def test_bad_cursor_goes_back_to_the_first_page(self):
+        for after in ("nonsense", "2026-01-01_x", "_5"):
+            with self.subTest(after=after):
+                self.assertRedirects(
+                    self.page(after), reverse("crossword:saved_crosswords")
+                )
+
+
+class MovePuzzlesMigrationTests(TransactionTestCase):
+    """
+    0008 collapses identical saved grids onto one Puzzle and can be reversed
+    """
+
+    before = [("crossword", "0007_puzzle")]
+    after = [("crossword", "0009_saved_crossword_puzzle_required")]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_duplicates_share_one_puzzle_and_reverse_restores_grids(self):
+        apps = self.migrate(self.before)
+        user = apps.get_model("auth", "User").objects.create(username="solver")
+        SavedCrossword = apps.get_model("crossword", "SavedCrossword")
+        grid = {
+            "rows": 2,
+            "cols": 3,
+            "letters": "C-TDOG",
+            "numbers": {"0": [1, 1]},
+            "labels": {},
+            "across_clues": [{"number": 1, "clue": "pet"}],
+            "down_clues": [],
+        }
+        for progress in ("C-    ", " -TDOG", " -    "):
+            SavedCrossword.objects.create(
+                user=user, category="animals", progress=progress, **grid
+            )
+        SavedCrossword.objects.create(
+            user=user,
+            category="animals",
+            progress=" -    ",
+            **{**grid, "letters": "C-TCOW"},
+        )
+
+        apps = self.migrate(self.after)
+        Puzzle = apps.get_model("crossword", "Puzzle")
+        SavedCrossword = apps.get_model("crossword", "SavedCrossword")
+        self.assertEqual(Puzzle.objects.count(), 2)
+        saves = list(SavedCrossword.objects.order_by("pk"))
+        self.assertEqual(len({saved.puzzle_id for saved in saves[:3]}), 1)
+        self.assertNotEqual(saves[0].puzzle_id, saves[3].puzzle_id)
+        self.assertEqual(
+            [saved.progress for saved in saves],
+            ["C-    ", " -TDOG", " -    ", " -    "],
+        )
+        self.assertEqual(Puzzle.objects.get(pk=saves[0].puzzle_id).letters, "C-TDOG")
+
+        apps = self.migrate(self.before)
+        SavedCrossword = apps.get_model("crossword", "SavedCrossword")
+        saves = list(SavedCrossword.objects.order_by("pk"))
+        self.assertEqual(
+            [saved.letters for saved in saves],
+            ["C-TDOG", "C-TDOG", "C-TDOG", "C-TCOW"],
+        )
+        self.assertEqual(saves[0].numbers, {"0": [1, 1]})
+        self.assertEqual(saves[0].across_clues, [{"number": 1, "clue": "pet"}])
+        self.assertEqual(saves[1].progress, " -TDOG")
+
+
+class PuzzleDataTests(TestCase):
+    """
+    GET puzzles/<content_hash>/: only for users with the puzzle saved
+    """
+
+    def setUp(self):
+        self.owner = User.objects.create_user("owner", password="pw-12345!")
+        puzzle = Puzzle.for_content(SaveProgressTests.SOLUTION, [], [])
+        SavedCrossword.objects.create(
+            user=self.owner,
+            puzzle=puzzle,
+            category="animals",
+            progress=empty_progress(puzzle.letters),
+        )
+        self.url = reverse("crossword:puzzle_data", args=[puzzle.content_hash])
+        self.etag = f'"{puzzle.content_hash}"'
+
+    def test_owner_can_revalidate(self):
+        self.client.force_login(self.owner)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        response = self.client.get(self.url, headers={"If-None-Match": self.etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_does_not_bypass_ownership(self):
+        other = User.objects.create_user("other", password="pw-12345!")
+        self.client.force_login(other)
+        response = self.client.get(self.url, headers={"If-None-Match": self.etag})
+        self.assertEqual(response.status_code, 404)
+
+
+class HomeRequestValidationTests(TestCase):
+    """
+    POST /: category and size are checked before a job or count is stored
+    """
+
+    def post(self, category, size):
+        return self.client.post(
+            reverse("crossword:home"),
+            {"user_input": category, "crossword-size": size},
+            headers={"X-Requested-With": "XMLHttpRequest"},
+        )
+
+    def test_bad_input_is_rejected(self):
+        for category, size in (
+            ("", "small"),
+            ("   ", "small"),
+            ("x" * 201, "small"),
+            ("animals", "huge"),
+            ("animals", "s" * 50),
+        ):
+            with self.subTest(category=category, size=size):
+                response = self.post(category, size)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("error", response.json())
+        self.assertFalse(GenerationJob.objects.exists())
+        self.assertFalse(CategoryPopularity.objects.exists())
+
+
+FAKE_GRID = [[{"letter": "A", "across_number": 1}, {"letter": "B"}]]
+
+
+class FakePuzzleSource:
+    async def aget_or_generate(self, category, size):
+        await asyncio.sleep(0)
+        if category == "broken":
+            raise RuntimeError("no words returned")
+        return GeneratedPuzzle.build(
+            FAKE_GRID,
+            [{"word": "AB", "number": 1, "clue": "ab"}],
+            [],
+            degraded=category == "fallback",
+        )
+
+
+class GenerationJobRunnerTests(TestCase):
+    """
+    Jobs run as tasks on the submitting event loop
+    """
+
+    async def run_job(self, category):
+        runner = GenerationJobRunner(FakePuzzleSource())
+        runner.start_sweeper = lambda: None
+        with benchmark.quiet_stage_logs():
+            job = await runner.asubmit(category, "small")
+            await asyncio.wrap_future(runner._queued[job.pk])
+        return await GenerationJob.objects.aget(pk=job.pk)
+
+    async def test_finished_job_keeps_the_puzzle(self):
+        job = await self.run_job("animals")
+        self.assertEqual(job.status, GenerationJob.DONE)
+        self.assertEqual(job.solution_grid, FAKE_GRID)
+        self.assertIsNotNone(job.finished_at)
+
+    async def test_failed_job_keeps_the_error(self):
+        job = await self.run_job("broken")
+        self.assertEqual(job.status, GenerationJob.FAILED)
+        self.assertEqual(job.error_message, "no words returned")
+
+    async def job_html(self, job):
+        with benchmark.quiet_stage_logs():
+            response = await self.async_client.get(
+                reverse("crossword:generation_job", args=[job.pk])
+            )
+        return response.json()["html"]
+
+    async def test_fallback_job_tells_the_user(self):
+        job = await self.run_job("fallback")
+        self.assertTrue(job.degraded)
+        self.assertIn("fallback-notice", await self.job_html(job))
+
+        job = await self.run_job("animals")
+        self.assertFalse(job.degraded)
+        self.assertNotIn("fallback-notice", await self.job_html(job))
+
+
+class CountingService:
+    """
+    Stands in for CrosswordService: numbered puzzles, no LLM
+    """
+
+    def __init__(self):
+        self.built = 0
+
+    def generate(self, category, size):
+        self.built += 1
+        return GeneratedPuzzle.build(FAKE_GRID, [{"number": self.built}], [])
+
+    async def agenerate(self, category, size):
+        return self.generate(category, size)
+
+
+@override_settings(PUZZLE_POOL_MIN_REQUESTS=2, PUZZLE_POOL_TARGET_STOCK=2)
+class PuzzlePoolTests(TestCase):
+    """
+    Stock of built puzzles for popular (category, size) pairs
+    """
+
+    def setUp(self):
+        self.service = CountingService()
+        self.pool = PuzzlePool(self.service)
+        self.refills = []
+        self.pool.schedule_refill = lambda *key: self.refills.append(key)
+
+    def test_categories_become_popular_by_requests(self):
+        self.pool.record_request("Jazz Musicians", "small")
+        self.assertFalse(self.pool.is_popular("jazz musician", "small"))
+        self.pool.record_request("jazz  musician", "small")
+        self.assertTrue(self.pool.is_popular("Jazz Musicians", "small"))
+        self.assertFalse(self.pool.is_popular("jazz musician", "medium"))
+        self.assertEqual(self.pool.popular(5), [("jazz musician", "small")])
+
+    def test_refill_tops_up_and_pop_serves_oldest_first(self):
+        self.assertEqual(self.pool.refill("Birds", "small"), 2)
+        self.assertEqual(self.pool.refill("birds", "small"), 0)
+        self.assertEqual(self.pool.stock("birds", "small"), 2)
+
+        _, across, _ = self.pool.pop("BIRDS", "small")
+        self.assertEqual(across, [{"number": 1}])
+        self.assertEqual(self.pool.stock("birds", "small"), 1)
+        self.assertIsNone(self.pool.pop("birds", "medium"))
+
+    @override_settings(PUZZLE_POOL_MAX_AGE=60)
+    def test_stale_stock_is_not_served(self):
+        self.pool.refill("birds", "small", target=1)
+        PooledPuzzle.objects.update(created_at=timezone.now() - timedelta(seconds=120))
+        self.assertIsNone(self.pool.pop("birds", "small"))
+        self.assertEqual(self.pool.drain_stale(), 1)
+        self.assertFalse(PooledPuzzle.objects.exists())
+
+    async def test_stock_is_served_before_generating(self):
+        await sync_to_async(self.pool.refill)("birds", "small", target=1)
+        puzzle = await self.pool.aget_or_generate("birds", "small")
+        self.assertEqual(puzzle[1], [{"number": 1}])
+        self.assertEqual(self.service.built, 1)
+        self.assertEqual(self.refills, [("birds", "small")])
+
+        # out of stock and not popular yet: built now, no refill
+        self.refills.clear()
+        await self.pool.aget_or_generate("fish", "small")
+        self.assertEqual(self.service.built, 2)
+        self.assertEqual(self.refills, [])
+
+
+class FailingClueGenerator:
+    def generate(self, category, num_words):
+        raise RuntimeError("LLM unavailable")
+
+    async def agenerate(self, category, num_words):
+        raise RuntimeError("LLM unavailable")
+
+
+class FallbackPuzzleTests(TestCase):
+    """
+    Puzzles built from fallback clues are marked degraded and never stored
+    """
+
+    def setUp(self):
+        self.provider = FallbackProvider(FailingClueGenerator(), WordListProvider())
+        self.addCleanup(caches["default"].clear)
+
+    @override_settings(CLUE_CACHE_ALIAS="default")
+    def test_fallback_clues_are_not_cached(self):
+        cache = CachedClueGenerator(self.provider)
+        clues = cache.generate("music", 10)
+        self.assertTrue(clues.degraded)
+        self.assertIsNone(caches["default"].get(cache.cache_key("music", 10)))
+        clues = asyncio.run(cache.agenerate("music", 10))
+        self.assertTrue(clues.degraded)
+        self.assertIsNone(caches["default"].get(cache.cache_key("music", 10)))
+
+    @benchmark.quiet_stage_logs()
+    def test_refill_skips_degraded_puzzles(self):
+        service = CrosswordService(self.provider)
+        self.assertTrue(service.generate("music", "small").degraded)
+        with self.assertLogs("crossword.services.puzzle_pool", "WARNING"):
+            added = PuzzlePool(service).refill("music", "small", target=2)
+        self.assertEqual(added, 0)
+        self.assertFalse(PooledPuzzle.objects.exists())
+
+    @override_settings(CROSSWORD_STREAMING=True)
+    @benchmark.quiet_stage_logs()
+    def test_streamed_fallback_is_degraded(self):
+        service = CrosswordService(self.provider)
+        self.assertTrue(asyncio.run(service.agenerate("music", "small")).degraded)
+
+
+class SingleFlightTests(SimpleTestCase):
+    """
+    Followers of a cancelled or abandoned leader make the call themselves
+    """
+
+    def setUp(self):
+        self.flight = SingleFlight("default", lock_timeout=5, wait_timeout=5)
+        self.addCleanup(caches["default"].clear)
+        self.calls = []
+
+    async def call(self):
+        self.calls.append(len(self.calls))
+        if len(self.calls) == 1:
+            # the leader's call never finishes by itself
+            await asyncio.sleep(10)
+        return "follower's own"
+
+    async def alookup(self):
+        return None
+
+    def test_cancelled_leader_does_not_cancel_followers(self):
+        async def main():
+            leader = asyncio.ensure_future(
+                self.flight.ado("k", self.call, self.alookup)
+            )
+            await asyncio.sleep(0.01)
+            follower = asyncio.ensure_future(
+                self.flight.ado("k", self.call, self.alookup)
+            )
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            return await follower
+
+        self.assertEqual(asyncio.run(main()), "follower's own")
+        self.assertEqual(len(self.calls), 2)
+
+    def test_abandoned_stream_leader_does_not_stop_followers(self):
+        async def stream():
+            yield await self.call()
+
+        async def collect():
+            return [
+                item
+                async for item in self.flight.ado_stream(
+                    "k", stream, self.alookup, replay=list
+                )
+            ]
+
+        async def main():
+            leader = asyncio.ensure_future(collect())
+            await asyncio.sleep(0.01)
+            follower = asyncio.ensure_future(collect())
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            return await follower
+
+        self.assertEqual(asyncio.run(main()), ["follower's own"])
+
+
+class APIError(Exception):
+    # shaped like google.genai.errors.APIError
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+class LLMTransportTests(SimpleTestCase):
+    """
+    Retries, hedging, concurrency cap and pacing around LLM calls
+    """
+
+    def transport(self, **options):
+        defaults = dict(
+            connect_timeout=1,
+            read_timeout=1,
+            max_connections=2,
+            max_concurrency=2,
+            acquire_timeout=1,
+            retry_attempts=3,
+            retry_base_delay=0,
+            retry_max_delay=0,
+            hedge=False,
+        )
+        return LLMTransport(**{**defaults, **options})
+
+    def failing(self, *codes):
+        attempts = []
+
+        def fn():
+            attempts.append(len(attempts))
+            if len(attempts) <= len(codes):
+                raise APIError(codes[len(attempts) - 1])
+            return "ok"
+
+        return fn, attempts
+
+    def test_retryable_errors_are_retried(self):
+        fn, attempts = self.failing(503, 429)
+        self.assertEqual(self.transport().call(fn), "ok")
+        self.assertEqual(len(attempts), 3)
+
+    def test_other_errors_and_last_attempts_are_raised(self):
+        fn, attempts = self.failing(400)
+        with self.assertRaises(APIError):
+            self.transport().call(fn)
+        self.assertEqual(len(attempts), 1)
+
+        fn, attempts = self.failing(503, 503, 503)
+        with self.assertRaises(APIError):
+            self.transport().call(fn)
+        self.assertEqual(len(attempts), 3)
+
+    def test_callers_wait_for_a_slot_up_to_the_timeout(self):
+        transport = self.transport(max_concurrency=1, acquire_timeout=0.01)
+        with transport.slot():
+            with self.assertRaisesMessage(RuntimeError, "in flight"):
+                transport.call(lambda: "ok")
+            with self.assertRaisesMessage(RuntimeError, "in flight"):
+                asyncio.run(transport.acall(self.async_ok))
+        self.assertEqual(transport.call(lambda: "ok"), "ok")
+
+    async def async_ok(self):
+        return "ok"
+
+    def test_slow_call_is_hedged(self):
+        transport = self.transport(hedge=True, hedge_min_samples=1)
+        transport._tracker("k").record(0.01)
+        started = []
+
+        async def afn():
+            started.append(len(started))
+            if len(started) == 1:
+                await asyncio.sleep(5)
+                return "slow"
+            return "hedge"
+
+        self.assertEqual(asyncio.run(transport.acall(afn, key="k")), "hedge")
+        self.assertEqual(len(started), 2)
+        # both slots are back
+        self.assertTrue(transport._slots.acquire(blocking=False))
+        self.assertTrue(transport._slots.acquire(blocking=False))
+
+    def test_requests_are_paced(self):
+        transport = self.transport(rate_limit=600)
+
+        async def main():
+            start = time.monotonic()
+            for _ in range(3):
+                await transport.acall(self.async_ok)
+            return time.monotonic() - start
+
+        # 600 a minute is one every 0.1s, the first goes straight away
+        self.assertGreaterEqual(asyncio.run(main()), 0.19)
+
+
+class SharedSemaphoreTests(SimpleTestCase):
+    """
+    LLM slots shared by threads and event loops
+    """
+
+    def setUp(self):
+        self.slots = SharedSemaphore(1)
+        self.assertTrue(self.slots.acquire(blocking=False))
+
+    def test_async_waiter_wakes_on_release_from_a_thread(self):
+        async def main():
+            threading.Timer(0.05, self.slots.release).start()
+            return await self.slots.aacquire(timeout=5)
+
+        self.assertTrue(asyncio.run(main()))
+        self.assertFalse(self.slots.acquire(blocking=False))
+
+    def test_timed_out_waiter_leaves_the_slot(self):
+        self.assertFalse(asyncio.run(self.slots.aacquire(timeout=0.01)))
+        self.assertFalse(self.slots.acquire(timeout=0.01))
+        self.slots.release()
+        self.assertTrue(self.slots.acquire(blocking=False))
+
+    def test_cancelled_waiter_does_not_keep_the_slot(self):
+        async def main():
+            waiter = asyncio.ensure_future(self.slots.aacquire())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            # released before the cancelled waiter runs: it passes the slot on
+            self.slots.release()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiter
+
+        asyncio.run(main())
+        self.assertTrue(self.slots.acquire(blocking=False))
+
+    def test_slots_go_to_waiters_in_order(self):
+        order = []
+
+        async def wait(name):
+            await self.slots.aacquire()
+            order.append(name)
+            self.slots.release()
+
+        async def main():
+            tasks = [asyncio.ensure_future(wait(name)) for name in "abc"]
+            await asyncio.sleep(0)
+            self.slots.release()
+            await asyncio.gather(*tasks)
+
+        asyncio.run(main())
+        self.assertEqual(order, ["a", "b", "c"])
+
+    def test_extra_release_is_an_error(self):
+        self.slots.release()
+        with self.assertRaises(ValueError):
+            self.slots.release()
+
+
+class MetricsExportTests(SimpleTestCase):
+    """
+    /metrics needs the bearer token, or DEBUG when none is configured
+    """
+
+    @override_settings(METRICS_TOKEN="", DEBUG=False)
+    def test_hidden_without_a_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 404)
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_token_is_required(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        response = self.client.get(
+            "/metrics", headers={"Authorization": "Bearer s3cret"}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    @benchmark.quiet_stage_logs()
+    def test_unknown_sizes_share_one_label(self):
+        with metrics.size_tier("huge"), metrics.span("test"):
+            pass
+        with metrics.size_tier("XL"), metrics.span("test"):
+            pass
+        exported = metrics.render()
+        self.assertIn('stage="test",size="other"', exported)
+        self.assertIn('stage="test",size="XL"', exported)
+        self.assertNotIn("huge", exported)
+
+
+class ClueStreamParserTests(SimpleTestCase):
+    RESPONSE = (
+        '{"clues": [{"word": "BRACE", "clue": "A { or a }"}, '
+        '{"word": "QUOTE", "clue": "Say \\"hi\\" back"}, '
+        '{"word": "SLASH", "clue": "A \\\\ mark"}]}'
+    )
+
+    def parse(self, chunks):
+        parser = ClueStreamParser()
+        return [
+            (clue.word, clue.clue) for chunk in chunks for clue in parser.feed(chunk)
+        ]
+
+    def test_whole_response(self):
+        self.assertEqual(
+            self.parse([self.RESPONSE]),
+            [
+                ("BRACE", "A { or a }"),
+                ("QUOTE", 'Say "hi" back'),
+                ("SLASH", "A \\ mark"),
+            ],
+        )
+
+    def test_any_chunk_split_gives_the_same_clues(self):
+        expected = self.parse([self.RESPONSE])
+        for size in (1, 2, 3, 7, 16):
+            chunks = [
+                self.RESPONSE[i : i + size] for i in range(0, len(self.RESPONSE), size)
+            ]
+            with self.subTest(size=size):
+                self.assertEqual(self.parse(chunks), expected)
+
+    def test_clue_is_returned_once_its_object_closes(self):
+        parser = ClueStreamParser()
+        self.assertEqual(parser.feed('{"clues": [{"word": "ONE", "clue": "1"'), [])
+        self.assertEqual([c.word for c in parser.feed("}, {")], ["ONE"])
+
+
+class FakeStreamGenerator:
+    def __init__(self):
+        self.requested = []
+        self.release = threading.Event()
+
+    def generate_stream(self, category, num_words):
+        self.requested.append(num_words)
+        for i in range(num_words):
+            if i == 1:
+                self.release.wait(5)
+            yield f"WORD{i}", f"clue {i}"
+
+    async def agenerate_stream(self, category, num_words):
+        self.requested.append(num_words)
+        for i in range(num_words):
+            await asyncio.sleep(0.01)
+            yield f"WORD{i}", f"clue {i}"
+
+
+SMALL_GRID_BUDGETS = {
+    "small": {"engine": "beam", "max_width": 6, "max_height": 5},
+    "default": {"engine": "beam", "max_width": None, "max_height": None},
+}
+
+
+@override_settings(CROSSWORD_PLACEMENT_BUDGETS=SMALL_GRID_BUDGETS)
+class WordListTests(SimpleTestCase):
+    """
+    Clean-up and ordering of clues between the provider and placement
+    """
+
+    def test_normalize_word(self):
+        for word, expected in (
+            ("New York", "NEWYORK"),
+            ("new-york", "NEWYORK"),
+            ("Caf\u00e9", "CAFE"),
+            ("Rock 'n' roll", "ROCKNROLL"),
+            ("R2D2", ""),
+            ("  ", ""),
+        ):
+            with self.subTest(word=word):
+                self.assertEqual(normalize_word(word), expected)
+
+    def test_max_length_follows_the_grid_limits(self):
+        self.assertEqual(max_word_length("small"), 6)
+        self.assertIsNone(max_word_length("medium"))
+        self.assertTrue(is_usable("ABCDEF", 6))
+        self.assertFalse(is_usable("ABCDEFG", 6))
+        self.assertTrue(is_usable("ABCDEFG"))
+        self.assertFalse(is_usable("A"))
+        self.assertFalse(is_usable(""))
+
+    def test_prepare_drops_duplicates_and_unusable_words(self):
+        clues = prepare_clues(
+            {
+                "Caf\u00e9": "first",
+                "cafe": "second",
+                "R2D2": "droid",
+                "X": "too short",
+                "Elephant": "too long",
+                "sea cow": "two words",
+            },
+            "small",
+        )
+        self.assertEqual(clues, {"CAFE": "first", "SEACOW": "two words"})
+
+    def test_prepare_orders_by_intersection_score(self):
+        scores = intersection_scores(["QUIZ", "TEA", "EAT", "EATEN"])
+        self.assertEqual(scores, {"QUIZ": 0, "TEA": 7, "EAT": 7, "EATEN": 8})
+        clues = prepare_clues(
+            {"quiz": "q", "tea": "t", "eat": "e", "eaten": "n"}, "medium"
+        )
+        # ties keep the provider's order
+        self.assertEqual(list(clues), ["EATEN", "TEA", "EAT", "QUIZ"])
+
+
+class NormalizeCategoryTests(SimpleTestCase):
+    """
+    Categories differing only in case, spacing or plurals share a cache key
+    """
+
+    def test_normalization_table(self):
+        for category, expected in (
+            ("  Jazz   Musicians ", "jazz musician"),
+            ("Dogs", "dog"),
+            ("puppies", "puppy"),
+            ("Countries of Europe", "country of europe"),
+            ("movies", "movie"),
+            ("Holiday cookies", "holiday cookie"),
+            ("pies", "pie"),
+            ("zombies", "zombie"),
+            ("foxes", "fox"),
+            ("dishes", "dish"),
+            ("glass", "glass"),
+            ("octopus", "octopus"),
+            ("tennis", "tennis"),
+            ("gas", "gas"),
+            ("", ""),
+        ):
+            with self.subTest(category=category):
+                self.assertEqual(normalize_category(category), expected)
+
+
+@override_settings(CLUE_CACHE_ALIAS="default", CLUE_CACHE_POOL_FACTOR=1.5)
+class CachedClueStreamTests(SimpleTestCase):
+    """
+    generate_stream misses: pool-sized request, coalesced like generate
+    """
+
+    def setUp(self):
+        self.generator = FakeStreamGenerator()
+        self.cache = CachedClueGenerator(self.generator)
+        self.addCleanup(caches["default"].clear)
+
+    def test_miss_streams_num_words_and_stores_the_pool(self):
+        self.generator.release.set()
+        words = list(self.cache.generate_stream("birds", 10))
+        self.assertEqual(len(words), 10)
+        self.assertEqual(self.generator.requested, [15])
+        self.assertEqual(
+            len(caches["default"].get(self.cache.cache_key("birds", 10))), 15
+        )
+
+    def test_concurrent_misses_share_one_stream(self):
+        results = {}
+
+        def follow():
+            results["follower"] = list(self.cache.generate_stream("birds", 10))
+
+        leader = self.cache.generate_stream("birds", 10)
+        results["leader"] = [next(leader)]
+        follower = threading.Thread(target=follow)
+        follower.start()
+        self.generator.release.set()
+        results["leader"] += list(leader)
+        follower.join(5)
+
+        self.assertEqual(self.generator.requested, [15])
+        self.assertEqual(len(results["leader"]), 10)
+        self.assertEqual(len(results["follower"]), 10)
+
+    def test_async_misses_share_one_stream(self):
+        async def collect():
+            return [pair async for pair in self.cache.agenerate_stream("birds", 10)]
+
+        async def main():
+            return await asyncio.gather(collect(), collect())
+
+        leader, follower = asyncio.run(main())
+        self.assertEqual(self.generator.requested, [15])
+        self.assertEqual(len(leader), 10)
+        self.assertEqual(len(follower), 10)
+        self.assertEqual(
+            len(caches["default"].get(self.cache.cache_key("birds", 10))), 15
+        )
+
+    @override_settings(CROSSWORD_STREAMING=True)
+    @benchmark.quiet_stage_logs()
+    def test_async_generate_places_streamed_words(self):
+        service = CrosswordService(WordListProvider())
+        grid, across, down = asyncio.run(service.agenerate("music", "small"))
+        self.assertTrue(grid)
+        self.assertGreater(len(across) + len(down), 1)
+
+
+def letter_word(prefix, i):
+    # digits would be dropped by normalize_word, spell them with A-J
+    return prefix + "".join(chr(ord("A") + int(d)) for d in str(i))
+
+
+class FakeChunkGenerator(CrosswordClueGenerator):
+    """
+    Answers each letter-range call locally: num_words words starting with
+    the range's first letter, one of them a word every range repeats
+    """
+
+    def __init__(self, failing=(), slow=(), shared=True):
+        super().__init__()
+        self.failing = set(failing)
+        self.slow = set(slow)
+        self.shared = shared
+        self.calls = []
+        self.cancelled = []
+
+    def _answer(self, num_words, letters):
+        first = letters[0] if letters else "A"
+        self.calls.append((num_words, letters))
+        if first in self.failing:
+            raise RuntimeError("Too many LLM requests in flight")
+        clues = {"SHARED": "in every range"} if self.shared else {}
+        for i in range(num_words - len(clues)):
+            clues[letter_word(first, i)] = f"clue {i}"
+        return clues
+
+    def _generate_one(self, category, num_words, letters=None):
+        return self._answer(num_words, letters)
+
+    async def _agenerate_one(self, category, num_words, letters=None):
+        first = letters[0] if letters else "A"
+        try:
+            await asyncio.sleep(5 if first in self.slow else 0)
+        except asyncio.CancelledError:
+            self.cancelled.append(first)
+            raise
+        return self._answer(num_words, letters)
+
+
+@override_settings(
+    LLM_CHUNK_WORDS=25,
+    LLM_CHUNK_MIN_WORDS=80,
+    LLM_CHUNK_SPARE=1,
+    LLM_MAX_CONCURRENCY=16,
+)
+class ChunkedClueGenerationTests(SimpleTestCase):
+    """
+    Large requests split into letter-range calls and merged
+    """
+
+    def test_small_requests_are_one_call(self):
+        generator = FakeChunkGenerator()
+        self.assertEqual(len(generator.generate("space", 50)), 50)
+        self.assertEqual(generator.calls, [(50, None)])
+
+    def test_chunks_are_merged_without_duplicates(self):
+        generator = FakeChunkGenerator()
+        clues = generator.generate("space", 100)
+        self.assertEqual([words for words, _ in generator.calls], [25] * 4)
+        # every range repeats SHARED, it is kept once
+        self.assertEqual(list(clues).count("SHARED"), 1)
+        self.assertEqual(len(clues), 4 * 24 + 1)
+
+    @override_settings(LLM_MAX_CONCURRENCY=4)
+    def test_fan_out_is_capped_at_half_the_slots(self):
+        generator = FakeChunkGenerator()
+        self.assertEqual(len(generator._chunks(150, spare=1)), 2)
+
+    def test_partial_failure_raises(self):
+        # sync ranges start A E M S, async ones (with the spare) A D I P T
+        generator = FakeChunkGenerator(failing="DIMS")
+        with self.assertRaisesMessage(RuntimeError, "Too many LLM requests"):
+            generator.generate("space", 100)
+        with self.assertRaisesMessage(RuntimeError, "Too many LLM requests"):
+            asyncio.run(generator.agenerate("space", 100))
+
+    def test_failed_call_covered_by_the_spare(self):
+        generator = FakeChunkGenerator(failing="A", shared=False)
+        clues = asyncio.run(generator.agenerate("space", 96))
+        self.assertEqual(len(clues), 96)
+
+    def test_slow_spare_is_cancelled(self):
+        # 100 words in 4 calls of 25 plus a spare; the last range never answers
+        ranges = FakeChunkGenerator()._chunks(100, spare=1)
+        last = ranges[-1][1][0]
+        generator = FakeChunkGenerator(slow=last, shared=False)
+        with self.assertLogs("crossword.services.llm_service", "INFO"):
+            clues = asyncio.run(generator.agenerate("space", 100))
+        self.assertEqual(len(clues), 100)
+        self.assertEqual(generator.cancelled, [last])
+
+
+class PaddedWordList(WordListProvider):
+    """
+    Corpus words plus one no grid can hold, remembering how many survive
+    prepare_clues
+    """
+
+    def generate(self, category, num_words):
+        clues = super().generate(category, num_words)
+        clues["SUPERCALIFRAGILISTICEXPIALIDOCIOUS"] = "too long for any grid"
+        self.prepared = len(prepare_clues(clues, "small"))
+        return clues
+
+
+class BatchGeneratorTests(SimpleTestCase):
+    """
+    Resumable JSONL archives from manage.py generate_crosswords
+    """
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.output = Path(tmp.name) / "puzzles.jsonl"
+
+        # lay out in this process, where quiet_stage_logs reaches
+        executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(executor.shutdown)
+        self.addCleanup(setattr, layout_pool, "get_pool", layout_pool.get_pool)
+        layout_pool.get_pool = lambda: executor
+
+    def write_lines(self, *lines):
+        self.output.write_text("".join(lines))
+
+    def test_truncated_record_is_dropped(self):
+        self.write_lines(
+            json.dumps({"index": 0}) + "\n",
+            json.dumps({"index": 1}) + "\n",
+            '{"index": 2, "solution": {"ro',
+        )
+        self.assertEqual(batch.completed_indexes(self.output), {0, 1})
+        lines = self.output.read_text().splitlines()
+        self.assertEqual([json.loads(line)["index"] for line in lines], [0, 1])
+
+    @benchmark.quiet_stage_logs()
+    def test_resume_builds_only_missing_items(self):
+        self.write_lines(
+            json.dumps({"index": 0}) + "\n",
+            json.dumps({"index": 2}) + "\n",
+        )
+        provider = PaddedWordList()
+        generator = batch.BatchGenerator(
+            service=CrosswordService(provider), concurrency=2, seed=7
+        )
+        items = [(i, "music", "small") for i in range(3)]
+        report = generator.run(items, self.output)
+
+        self.assertEqual((report.skipped, report.completed, report.failed), (2, 1, 0))
+        records = [json.loads(line) for line in self.output.read_text().splitlines()]
+        self.assertEqual([record["index"] for record in records], [0, 2, 1])
+        stats = records[-1]["stats"]
+        self.assertEqual(stats["seed"], 8)
+        self.assertEqual(stats["words_received"], provider.prepared)
+        self.assertGreater(stats["words_placed"], 1)
+
+        # nothing left to do on the next run
+        self.assertEqual(generator.run(items, self.output).completed, 0)
@@ -6,8 +6,11 @@ app_name = "crossword"
 
 urlpatterns = [
     path("", views.home, name="home"),
+    path("jobs/<uuid:job_id>/", views.generation_job, name="generation_job"),
     path("save/", views.save_crossword, name="save_crossword"),
     path("saved/", views.saved_crosswords, name="saved_crosswords"),
     path("saved/<int:pk>/", views.load_saved_crossword, name="load_saved_crossword"),
+    path("saved/<int:pk>/progress/", views.save_progress, name="save_progress"),
+    path("puzzles/<str:content_hash>/", views.puzzle_data, name="puzzle_data"),
     path("saved/<int:pk>/delete/", views.delete_saved_crossword, name="delete_saved_crossword"),
 ]
@@ -0,0 +1,112 @@
+"""
+Compact storage format for crossword grids.
+
+A solution grid is stored as
+    {
+        "rows": 12,
+        "cols": 15,
+        "letters": "--CAT---...",         # row-major, "-" for black squares
+        "numbers": {"17": [3, 5], ...},   # cell index -> [across, down], 0 = none
+        "labels": {"17": "3/5", ...},     # cell index -> corner label
+    }
+and progress as a string of the same length as letters, with "-" for
+black squares and " " for empty white squares.
+
+Saved puzzles are deduplicated by content_hash of the compact solution
+and the clue lists.
+"""
+
+import hashlib
+import json
+
+BLACK = "-"
+EMPTY = " "
+
+
+def encode_grid(grid):
+    """
+    List of rows of {"letter", "across_number", "down_number", "label"?}
+    cells -> compact dict
+    """
+    rows = len(grid)
+    cols = len(grid[0]) if rows else 0
+    letters = []
+    numbers = {}
+    labels = {}
+    for r, row in enumerate(grid):
+        for c, cell in enumerate(row):
+            letters.append(cell["letter"])
+            index = str(r * cols + c)
+            across = cell.get("across_number") or 0
+            down = cell.get("down_number") or 0
+            if across or down:
+                numbers[index] = [across, down]
+            if cell.get("label"):
+                labels[index] = cell["label"]
+    return {
+        "rows": rows,
+        "cols": cols,
+        "letters": "".join(letters),
+        "numbers": numbers,
+        "labels": labels,
+    }
+
+
+def decode_grid(data):
+    """
+    Compact dict -> list of rows of cell dicts, as built by CrosswordService
+    """
+    cols = data["cols"]
+    letters = data["letters"]
+    numbers = data["numbers"]
+    labels = data["labels"]
+    grid = []
+    for r in range(data["rows"]):
+        row = []
+        for c in range(cols):
+            index = str(r * cols + c)
+            across, down = numbers.get(index, (0, 0))
+            cell = {
+                "letter": letters[r * cols + c],
+                "across_number": across or None,
+                "down_number": down or None,
+            }
+            if index in labels:
+                cell["label"] = labels[index]
+            row.append(cell)
+        grid.append(row)
+    return grid
+
+
+def encode_progress(progress_grid):
+    """
+    List of rows of "-" / "" / letter -> progress string
+    """
+    return "".join((value or EMPTY)[0] for row in progress_grid for value in row)
+
+
+def decode_progress(progress, cols):
+    """
+    Progress string -> list of rows of "-" / "" / letter
+    """
+    cells = [value if value != EMPTY else "" for value in progress]
+    return [cells[i : i + cols] for i in range(0, len(cells), cols)]
+
+
+def empty_progress(letters):
+    """
+    Progress string for an untouched puzzle
+    """
+    return "".join(BLACK if letter == BLACK else EMPTY for letter in letters)
+
+
+def content_hash(solution, across_clues, down_clues):
+    """
+    sha256 hex digest identifying a puzzle by its solution and clues
+    """
+    content = json.dumps(
+        {"solution": solution, "across": across_clues, "down": down_clues},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
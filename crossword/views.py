@@ -1,53 +1,183 @@
 # crossword/views.py
+import hmac
 import json
+from datetime import datetime
+from string import ascii_letters
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth import logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import UserCreationForm
-from django.http import JsonResponse
+from django.db import transaction
+from django.db.models import Q
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.http import require_POST
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_http_methods, require_POST
 
-from .models import SavedCrossword
-from .services.crossword_service import crossword_service
+from .models import GenerationJob, Puzzle, SavedCrossword
+from .services import metrics
+from .services.generation_jobs import generation_jobs
+from .services.placement import SIZES
+from .services.puzzle_pool import puzzle_pool
+from .utils import BLACK, EMPTY, empty_progress, encode_grid, encode_progress
 
+PUZZLE_CACHE_MAX_AGE = 60 * 60 * 24
+MAX_CATEGORY_LENGTH = GenerationJob._meta.get_field("category").max_length
 
-def home(request):
+
+def _puzzle_payload(solution, across_clues, down_clues):
+    """
+    What crossword.js builds the grid and clue lists from
+    """
+    return {
+        "solution": solution,
+        "across_clues": across_clues,
+        "down_clues": down_clues,
+    }
+
+
+def _crossword_context(
+    category, crossword_grid, across_clues, down_clues, error_message, degraded=False
+):
+    return {
+        "puzzle": _puzzle_payload(
+            encode_grid(crossword_grid) if crossword_grid else None,
+            across_clues,
+            down_clues,
+        ),
+        "error_message": error_message,
+        # built from the fallback word list, the partial says so
+        "degraded": degraded,
+        "category": category,
+        "progress": "",
+        "from_saved": False,
+    }
+
+
+async def home(request):
     if request.method == "POST":
-        category = request.POST.get("user_input", "")
-        size = request.POST.get("crossword-size", "small")
+        category = request.POST.get("user_input", "").strip()
+        # the size picker's placeholder posts an empty value
+        size = request.POST.get("crossword-size") or "small"
+        is_xhr = request.headers.get("X-Requested-With") == "XMLHttpRequest"
+
+        error_message = _generation_request_error(category, size)
+        if error_message:
+            if is_xhr:
+                return JsonResponse({"error": error_message}, status=400)
+            context = _crossword_context(category, [], [], [], error_message)
+            return await sync_to_async(render)(
+                request, "crossword/crossword.html", context, status=400
+            )
+
+        # if request came from fetch on the home page, queue a job and let the
+        # page poll for the partial instead of holding the worker
+        if is_xhr:
+            with metrics.size_tier(size), metrics.span("submit"):
+                job = await generation_jobs.asubmit(category, size)
+            return JsonResponse(
+                {
+                    "job_id": str(job.pk),
+                    "status": job.status,
+                    "status_url": reverse("crossword:generation_job", args=[job.pk]),
+                },
+                status=202,
+            )
+
         error_message = None
         crossword_grid = []
         across_clues = []
         down_clues = []
-        
-        try:
-            crossword_grid, across_clues, down_clues = crossword_service.generate(
-                category, size=size
-            )
+        degraded = False
 
-        except Exception as e:
-            error_message = str(e)
+        with metrics.size_tier(size):
+            try:
+                with metrics.span("serve"):
+                    puzzle = await puzzle_pool.aget_or_generate(category, size=size)
+                crossword_grid, across_clues, down_clues = puzzle
+                degraded = puzzle.degraded
 
-        context = {
-            "crossword_grid": crossword_grid,
-            "across_clues": across_clues,
-            "down_clues": down_clues,
-            "error_message": error_message,
-            "category": category,
-            "progress_grid": [],
-            "from_saved": False,
-        }
+            except Exception as e:
+                error_message = str(e)
 
-        # if request came from fetch on the home page, return ONLY the partial
-        if request.headers.get("X-Requested-With") == "XMLHttpRequest":
-            return render(request, "crossword/crossword_partial.html", context)
+            context = _crossword_context(
+                category,
+                crossword_grid,
+                across_clues,
+                down_clues,
+                error_message,
+                degraded,
+            )
 
-        # if user hits the url in the browser return full page
-        return render(request, "crossword/crossword.html", context)
+            # if user hits the url in the browser return full page
+            # (rendering checks request.user, which hits the DB, so it runs on a thread)
+            with metrics.span("render"):
+                return await sync_to_async(render)(
+                    request, "crossword/crossword.html", context
+                )
 
     # return the home screen at start
-    return render(request, "crossword/home.html")
+    return await sync_to_async(render)(request, "crossword/home.html")
+
+
+def _generation_request_error(category, size):
+    """
+    Why a category/size pair from the home form can't be generated, or None.
+    Both end up in CharFields, so they are checked before anything is stored.
+    """
+    if not category:
+        return "Please enter a category"
+    if len(category) > MAX_CATEGORY_LENGTH:
+        return f"Categories can be at most {MAX_CATEGORY_LENGTH} characters"
+    if size not in SIZES:
+        return f"Unknown crossword size: {size[:20]}"
+    return None
+
+
+def generation_job(request, job_id):
+    """
+    Polled by the home page: job status, plus the rendered partial once finished
+    """
+    job = get_object_or_404(GenerationJob, pk=job_id)
+    data = {"job_id": str(job.pk), "status": job.status}
+
+    if job.status in (GenerationJob.DONE, GenerationJob.FAILED):
+        context = _crossword_context(
+            job.category,
+            job.solution_grid or [],
+            job.across_clues,
+            job.down_clues,
+            job.error_message or None,
+            job.degraded,
+        )
+        with metrics.size_tier(job.size), metrics.span("render"):
+            data["html"] = render_to_string(
+                "crossword/crossword_partial.html", context, request=request
+            )
+    return JsonResponse(data)
+
+
+def metrics_export(request):
+    """
+    Prometheus scrape endpoint. The scraper must send settings.METRICS_TOKEN
+    as a bearer token; without a token it is only served with DEBUG on.
+    """
+    token = settings.METRICS_TOKEN
+    if not token:
+        if not settings.DEBUG:
+            return HttpResponse(status=404)
+    elif not hmac.compare_digest(
+        request.headers.get("Authorization", ""), f"Bearer {token}"
+    ):
+        return HttpResponse(status=403)
+    return HttpResponse(
+        metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
 
 def signup(request):
@@ -74,38 +204,183 @@ def save_crossword(request):
         data = json.loads(request.body.decode("utf-8"))
 
         category = data.get("category")
-        solution_grid = data.get("solution_grid")
-        progress_grid = data.get("progress_grid")
+        solution = data.get("solution")
+        progress = data.get("progress")
         across_clues = data.get("across_clues")
         down_clues = data.get("down_clues")
 
-        if not solution_grid:
+        # pages loaded before the compact format still send full grids
+        if not solution and data.get("solution_grid"):
+            solution = encode_grid(data["solution_grid"])
+            progress = encode_progress(data.get("progress_grid") or [])
+
+        if not solution:
             return JsonResponse(
                 {"success": False, "error": "Missing required fields"},
                 status=400,
             )
+        if not progress or len(progress) != len(solution["letters"]):
+            progress = empty_progress(solution["letters"])
+        progress = _aligned_progress(progress, solution["letters"])
+        if progress is None:
+            return JsonResponse(
+                {"success": False, "error": "Cells must be a letter A-Z or empty"},
+                status=400,
+            )
 
-        saved = SavedCrossword.objects.create(
-            user=request.user,
-            category=category,
-            solution_grid=solution_grid,
-            progress_grid=progress_grid,
-            across_clues=across_clues,
-            down_clues=down_clues,
-        )
+        # identical puzzles saved by different users share one Puzzle row
+        with transaction.atomic():
+            puzzle = Puzzle.for_content(solution, across_clues or [], down_clues or [])
+            saved = SavedCrossword.objects.create(
+                user=request.user,
+                puzzle=puzzle,
+                category=category,
+                progress=progress,
+            )
 
-        return JsonResponse({"success": True, "id": saved.id})
+        return JsonResponse(
+            {
+                "success": True,
+                "id": saved.id,
+                "version": saved.version,
+                "progress_url": reverse("crossword:save_progress", args=[saved.id]),
+            }
+        )
 
     except Exception as e:
         return JsonResponse({"success": False, "error": str(e)}, status=500)
 
 
+@login_required
+@require_http_methods(["PATCH"])
+def save_progress(request, pk):
+    """
+    Applies the cells changed since the client's last save.
+
+    Body: {"version": <version the client last saw>, "cells": {index: letter}}
+    with "" for a cleared cell. Returns 409 with the stored progress when the
+    version is stale so the client can re-apply its changes on top.
+    """
+    try:
+        data = json.loads(request.body.decode("utf-8"))
+        version = int(data["version"])
+        cells = data["cells"]
+        if not isinstance(cells, dict):
+            raise TypeError("cells must be an object")
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse(
+            {"success": False, "error": "Missing required fields"}, status=400
+        )
+    if not all(_is_cell_value(value) for value in cells.values()):
+        return JsonResponse(
+            {"success": False, "error": "Cells must be a letter A-Z or empty"},
+            status=400,
+        )
+
+    saved = get_object_or_404(
+        SavedCrossword.objects.select_related("puzzle").only(
+            "progress", "version", "puzzle__letters"
+        ),
+        pk=pk,
+        user=request.user,
+    )
+    if saved.version != version:
+        return _version_conflict(saved)
+
+    letters = saved.puzzle.letters
+    progress = list(saved.progress)
+    for index, value in cells.items():
+        # isdigit alone accepts "²" and other digits int() rejects
+        index = int(index) if index.isascii() and index.isdigit() else -1
+        if not 0 <= index < len(progress) or letters[index] == BLACK:
+            continue
+        progress[index] = value.upper() or EMPTY
+
+    # only write if nobody saved in between
+    updated = SavedCrossword.objects.filter(
+        pk=saved.pk, user=request.user, version=version
+    ).update(progress="".join(progress), version=version + 1, updated_at=timezone.now())
+    if not updated:
+        saved.refresh_from_db(fields=["progress", "version"])
+        return _version_conflict(saved)
+
+    return JsonResponse({"success": True, "version": version + 1})
+
+
+def _is_cell_value(value):
+    # "" clears a cell; anything else would break the progress format
+    return value == "" or (
+        isinstance(value, str) and len(value) == 1 and value in ascii_letters
+    )
+
+
+def _aligned_progress(progress, letters):
+    """
+    Progress string with BLACK exactly where the solution has it, or None
+    when any other cell isn't a letter or EMPTY
+    """
+    if not isinstance(progress, str):
+        return None
+    cells = []
+    for letter, value in zip(letters, progress):
+        if letter == BLACK:
+            cells.append(BLACK)
+        elif value == EMPTY or _is_cell_value(value):
+            cells.append(value.upper())
+        else:
+            return None
+    return "".join(cells)
+
+
+def _version_conflict(saved):
+    return JsonResponse(
+        {
+            "success": False,
+            "error": "Version conflict",
+            "version": saved.version,
+            "progress": saved.progress,
+        },
+        status=409,
+    )
+
+
+SAVED_CROSSWORDS_PAGE_SIZE = 25
+
+
 # List the users saved crosswords/progress
 @login_required
 def saved_crosswords(request):
-    crosswords = SavedCrossword.objects.filter(user=request.user).order_by("updated_at")
+    # only the columns the list shows, the grids and clues stay in the DB
+    crosswords = (
+        SavedCrossword.objects.filter(user=request.user)
+        .only("id", "category", "created_at", "updated_at")
+        .order_by("updated_at", "id")
+    )
+
+    # keyset pagination: ?after=<updated_at>_<id> of the last row on the previous page
+    after = request.GET.get("after")
+    if after:
+        try:
+            updated_at, last_id = after.rsplit("_", 1)
+            updated_at = datetime.fromisoformat(updated_at)
+            last_id = int(last_id)
+        except ValueError:
+            return redirect("crossword:saved_crosswords")
+        crosswords = crosswords.filter(
+            Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=last_id)
+        )
+
+    page = list(crosswords[: SAVED_CROSSWORDS_PAGE_SIZE + 1])
+    next_cursor = None
+    if len(page) > SAVED_CROSSWORDS_PAGE_SIZE:
+        page = page[:SAVED_CROSSWORDS_PAGE_SIZE]
+        last = page[-1]
+        next_cursor = f"{last.updated_at.isoformat()}_{last.id}"
+
     context = {
-        "crosswords": crosswords,
+        "crosswords": page,
+        "next_cursor": next_cursor,
+        "is_first_page": not after,
     }
     return render(request, "crossword/saved_crosswords.html", context)
 
@@ -113,26 +388,70 @@ def saved_crosswords(request):
 @login_required
 def load_saved_crossword(request, pk):
     # load saved crosswords the same way new ones are loaded
-    saved = get_object_or_404(SavedCrossword, pk=pk, user=request.user)
+    saved = get_object_or_404(
+        SavedCrossword.objects.select_related("puzzle").only(
+            "category", "progress", "version", "puzzle__content_hash"
+        ),
+        pk=pk,
+        user=request.user,
+    )
 
     context = {
-        "crossword_grid": saved.solution_grid,
-        "across_clues": saved.across_clues,
-        "down_clues": saved.down_clues,
+        # the page only links the puzzle, the browser caches the payload
+        "puzzle_url": reverse(
+            "crossword:puzzle_data", args=[saved.puzzle.content_hash]
+        ),
         "category": saved.category,
-        "progress_grid": saved.progress_grid,
+        "progress": saved.progress,
+        "saved_crossword": {
+            "id": saved.id,
+            "version": saved.version,
+            "progress_url": reverse("crossword:save_progress", args=[saved.id]),
+        },
         "error_message": None,
         "from_saved": True,
     }
     return render(request, "crossword/crossword.html", context)
 
 
+def _owned_puzzle_etag(request, content_hash):
+    # no ETag, so no 304, unless this user has the puzzle saved
+    owned = SavedCrossword.objects.filter(
+        user=request.user, puzzle__content_hash=content_hash
+    ).exists()
+    return content_hash if owned else None
+
+
+# puzzles are content addressed, so the hash in the URL is also a strong ETag;
+# a revalidation only checks ownership and never loads the puzzle
+@login_required
+@cache_control(private=True, max_age=PUZZLE_CACHE_MAX_AGE)
+@condition(etag_func=_owned_puzzle_etag)
+def puzzle_data(request, content_hash):
+    puzzle = get_object_or_404(
+        Puzzle.objects.filter(saved_crosswords__user=request.user).distinct(),
+        content_hash=content_hash,
+    )
+    return JsonResponse(
+        _puzzle_payload(puzzle.solution, puzzle.across_clues, puzzle.down_clues)
+    )
+
+
 @login_required
 def delete_saved_crossword(request, pk):
     cw = get_object_or_404(SavedCrossword, pk=pk, user=request.user)
 
     if request.method == "POST":
-        cw.delete()
+        with transaction.atomic():
+            # lock the puzzle first so a save_crossword reusing it (which
+            # holds the same lock) either finishes before the check below
+            # or finds the row gone and creates it again
+            Puzzle.objects.select_for_update().filter(pk=cw.puzzle_id).first()
+            cw.delete()
+            # drop the puzzle too once nobody has it saved
+            Puzzle.objects.filter(
+                pk=cw.puzzle_id, saved_crosswords__isnull=True
+            ).delete()
         return redirect("crossword:saved_crosswords")
 
     return redirect("crossword:saved_crosswords")
@@ -0,0 +1,18 @@
+# Loaded automatically by gunicorn from the working directory
+
+
+def post_worker_init(worker):
+    from django.conf import settings
+
+    from crossword.services.generation_jobs import generation_jobs
+
+    # keep sweeping abandoned and finished generation jobs while this worker
+    # runs; jobs left behind by a previous worker are picked up once the
+    # first submit has given the runner its event loop
+    generation_jobs.start_sweeper()
+
+    # start the crossword layout pool before the worker takes requests
+    if settings.CROSSWORD_LAYOUT_SEEDS > 1:
+        from crossword.services.layout_pool import warm_pool
+
+        warm_pool()